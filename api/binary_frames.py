@@ -0,0 +1,51 @@
+import struct
+from typing import Any, Dict
+
+POSE_SLOTS = ('left', 'right', 'center')
+BLINK_SLOT = 'blink'
+
+_LENGTH = struct.Struct('>I')
+
+
+def parse_frames(body: bytes) -> Dict[str, Any]:
+    """Split a length-prefixed frame body into the same slot dict the JSON API uses.
+
+    Each record is: 1-byte slot name length, slot name (ASCII), 4-byte big-endian
+    payload length, raw image bytes. ``blink`` may repeat; payloads are returned
+    as memoryview slices of ``body`` so no image bytes are copied.
+    """
+    view = memoryview(body)
+    frames: Dict[str, Any] = {}
+    pos = 0
+    while pos < len(view):
+        name_len = view[pos]
+        pos += 1
+        name = bytes(view[pos:pos + name_len]).decode('ascii', errors='replace')
+        pos += name_len
+        if pos + _LENGTH.size > len(view):
+            raise ValueError(f"Truncated header for frame '{name}'")
+        (size,) = _LENGTH.unpack_from(view, pos)
+        pos += _LENGTH.size
+        if pos + size > len(view):
+            raise ValueError(f"Truncated payload for frame '{name}'")
+        payload = view[pos:pos + size]
+        pos += size
+
+        if name == BLINK_SLOT:
+            frames.setdefault(BLINK_SLOT, []).append(payload)
+        elif name in POSE_SLOTS:
+            frames[name] = payload
+        else:
+            raise ValueError(f"Unknown frame slot '{name}'")
+    return frames
+
+
+def encode_frames(frames: Dict[str, Any]) -> bytes:
+    parts = []
+    for name, value in frames.items():
+        payloads = value if isinstance(value, list) else [value]
+        encoded_name = name.encode('ascii')
+        for payload in payloads:
+            parts.append(bytes([len(encoded_name)]) + encoded_name + _LENGTH.pack(len(payload)))
+            parts.append(bytes(payload))
+    return b''.join(parts)
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from api.errors import PoolTimeout
+from src.face_detector import FaceDetector
+
+
+class DetectorPool:
+    """Checkout/checkin pool so each request gets exclusive use of a FaceDetector."""
+
+    def __init__(self, size: int, factory: Callable[[], FaceDetector] = FaceDetector):
+        if size < 1:
+            raise ValueError("Detector pool size must be at least 1")
+        self.size = size
+        self._factory = factory
+        self._idle: "queue.LifoQueue[FaceDetector]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._started = time.perf_counter()
+        self._busy_since = self._started
+        self._busy_time = 0.0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    @property
+    def created(self) -> int:
+        return self._created
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    def _account_busy(self, now: float):
+        # Integrates "detectors in use" over time; caller holds the lock.
+        self._busy_time += self._in_use * (now - self._busy_since)
+        self._busy_since = now
+
+    def _acquire(self, timeout: Optional[float]) -> FaceDetector:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self._factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"No detector available after {timeout}s")
+
+    def acquire(self, timeout: Optional[float] = None) -> FaceDetector:
+        start = time.perf_counter()
+        detector = self._acquire(timeout)
+        now = time.perf_counter()
+        waited = now - start
+        with self._lock:
+            self._account_busy(now)
+            self._in_use += 1
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+        return detector
+
+    def try_acquire(self) -> Optional[FaceDetector]:
+        """An idle detector, or None without waiting. Never creates one: that costs more than
+        the parallelism it would buy, so callers fall back to the detector they hold."""
+        try:
+            detector = self._idle.get_nowait()
+        except queue.Empty:
+            return None
+        with self._lock:
+            self._account_busy(time.perf_counter())
+            self._in_use += 1
+            self.checkouts += 1
+        return detector
+
+    def release(self, detector: FaceDetector):
+        # No reset here: it costs about as much as a detection, and FaceTracker already
+        # re-detects when tracking state left by the previous request does not match.
+        with self._lock:
+            self._account_busy(time.perf_counter())
+            self._in_use -= 1
+        self._idle.put(detector)
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[FaceDetector]:
+        detector = self.acquire(timeout)
+        try:
+            yield detector
+        finally:
+            self.release(detector)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.perf_counter()
+            self._account_busy(now)
+            elapsed = now - self._started
+            return {
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_time_avg_ms': round(self.wait_time_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_time_max_ms': round(self.wait_time_max * 1000, 3),
+                'utilisation': round(self._busy_time / (elapsed * self.size), 4) if elapsed > 0 else 0.0
+            }
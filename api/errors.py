@@ -0,0 +1,11 @@
+# Kept free of heavy imports so api.main can catch these before the inference modules load.
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ExecutorSaturated(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Server sedang sibuk, coba lagi nanti")
+        self.retry_after = retry_after
@@ -0,0 +1,172 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from api.errors import ExecutorSaturated
+from api.liveness_service import LivenessResult, LivenessService, default_parallelism, liveness_service
+from api.metrics import NULL_TIMINGS, Timings
+from api.verification import create_batcher, create_face_embedding, embedding_batcher
+from src.embedding import EmbeddingBatcher
+
+
+_process_service: Optional[LivenessService] = None
+_process_batcher: Optional[EmbeddingBatcher] = None
+_process_warm_up: Tuple[int, bool] = (0, False)
+_warm_up_barrier: Any = None
+WARM_UP_TIMEOUT = 300
+
+
+def _init_process_worker(barrier: Any):
+    # A process worker runs one request at a time; its pool only needs the detectors one
+    # request fans out over. Warming up here covers every process the pool starts, whichever
+    # tasks it ends up running.
+    global _process_service, _process_warm_up, _warm_up_barrier
+    _process_service = LivenessService(pool_size=default_parallelism())
+    _warm_up_barrier = barrier
+    embedding_loaded = worker_batcher().embedder.warm_up()
+    _process_warm_up = (_process_service.warm_up(), embedding_loaded)
+
+
+def worker_service() -> LivenessService:
+    # Thread workers share the module service and check detectors out of its pool.
+    return _process_service if _process_service is not None else liveness_service
+
+
+def worker_batcher() -> EmbeddingBatcher:
+    # Process workers load their own embedding model on first use; threads share the API's.
+    global _process_batcher
+    if _process_service is None:
+        return embedding_batcher
+    if _process_batcher is None:
+        _process_batcher = create_batcher(create_face_embedding())
+    return _process_batcher
+
+
+def run_warm_up() -> Tuple[int, bool]:
+    if _process_service is not None:
+        # The initializer already warmed this process. Holding it until every worker has
+        # reported lands exactly one of LivenessExecutor.warm_up's tasks on each process.
+        _warm_up_barrier.wait(WARM_UP_TIMEOUT)
+        return _process_warm_up
+    # The embedding model is optional; without it the liveness endpoints still work.
+    return worker_service().warm_up(), worker_batcher().embedder.warm_up()
+
+
+def run_validate_liveness(frames: Dict[str, Any], fail_fast: bool = False, collect_timings: bool = False) -> LivenessResult:
+    # Timings travel back with the result; the main process aggregates them.
+    timings = Timings() if collect_timings else NULL_TIMINGS
+    return worker_service().validate_liveness(frames, fail_fast=fail_fast, timings=timings)
+
+
+def run_verify(frames: Dict[str, Any], fail_fast: bool = False, collect_timings: bool = False) -> LivenessResult:
+    timings = Timings() if collect_timings else NULL_TIMINGS
+    return worker_service().verify(frames, worker_batcher().submit, fail_fast=fail_fast, timings=timings)
+
+
+def _picklable_frames(frames: Dict[str, Any]) -> Dict[str, Any]:
+    # Binary uploads arrive as memoryview slices, which cannot cross a process boundary.
+    def convert(value):
+        if isinstance(value, list):
+            return [convert(v) for v in value]
+        return bytes(value) if isinstance(value, memoryview) else value
+    return {key: convert(value) for key, value in frames.items()}
+
+
+class LivenessExecutor:
+    BACKENDS = ("thread", "process")
+
+    def __init__(self, backend: str = "thread", workers: Optional[int] = None,
+                 max_queue: Optional[int] = None, retry_after: int = 1):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown executor backend '{backend}', expected one of {self.BACKENDS}")
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * 2 if max_queue is None else max_queue
+        self.retry_after = retry_after
+        self.model_loaded = False
+        self._pending = 0
+        self._pool: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls) -> "LivenessExecutor":
+        workers = int(os.environ.get("LIVENESS_WORKERS", 0)) or None
+        max_queue = os.environ.get("LIVENESS_MAX_QUEUE")
+        return cls(
+            backend=os.environ.get("LIVENESS_EXECUTOR", "thread"),
+            workers=workers,
+            max_queue=int(max_queue) if max_queue is not None else None,
+            retry_after=int(os.environ.get("LIVENESS_RETRY_AFTER", 1)),
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            'backend': self.backend,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'pending': self._pending
+        }
+        # Process workers keep their pools in their own address space.
+        if self.backend == "thread" and liveness_service.detector_pool is not None:
+            stats['detector_pool'] = liveness_service.detector_pool.stats()
+        return stats
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.backend == "process":
+                context = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                 initializer=_init_process_worker,
+                                                 initargs=(context.Barrier(self.workers),))
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="liveness")
+        return self._pool
+
+    async def run(self, fn: Callable, *args):
+        # Only touched from the event loop thread, so a plain counter is enough.
+        if self._pending >= self.capacity:
+            raise ExecutorSaturated(self.retry_after)
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(), fn, *args)
+            self.model_loaded = True
+            return result
+        finally:
+            self._pending -= 1
+
+    async def warm_up(self) -> Tuple[int, bool]:
+        """Warm every worker; returns the detectors that ran a warm-up inference and whether
+        the embedding model loaded (in every worker, for the process backend)."""
+        if self.backend == "process":
+            # Spawned workers start one per submit while none is idle, so submitting one
+            # task per worker at once brings the whole pool up; each warms up as it starts.
+            results = await asyncio.gather(*(self.run(run_warm_up) for _ in range(self.workers)))
+            return sum(r[0] for r in results), all(r[1] for r in results)
+        return await self.run(run_warm_up)
+
+    async def validate_liveness(self, frames: Dict[str, Any], fail_fast: bool = False,
+                                collect_timings: bool = False) -> LivenessResult:
+        if self.backend == "process":
+            frames = _picklable_frames(frames)
+        return await self.run(run_validate_liveness, frames, fail_fast, collect_timings)
+
+    async def verify(self, frames: Dict[str, Any], fail_fast: bool = False,
+                     collect_timings: bool = False) -> LivenessResult:
+        if self.backend == "process":
+            frames = _picklable_frames(frames)
+        return await self.run(run_verify, frames, fail_fast, collect_timings)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
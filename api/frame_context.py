@@ -0,0 +1,229 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from api.metrics import NULL_TIMINGS, Timings
+from src.face_detector import FaceDetectionResult, FaceTracker
+
+
+DecodedFrame = Tuple[np.ndarray, Tuple[int, int]]
+
+
+@dataclass
+class FrameEntry:
+    result: Optional[FaceDetectionResult]
+    frame: Optional[np.ndarray] = None
+    # (width, height) of the full-resolution image; frame may be a reduced decode of it.
+    original_size: Optional[Tuple[int, int]] = None
+
+    @property
+    def decoded(self) -> bool:
+        return self.result is not None
+
+
+def frame_key(data: Any) -> str:
+    if isinstance(data, str):
+        data = data.encode("ascii", errors="ignore")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class FrameCache:
+    """LRU full-frame detection results keyed by payload hash, shared across requests."""
+
+    def __init__(self, max_size: int = 0):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, FaceDetectionResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: str) -> Optional[FaceDetectionResult]:
+        with self._lock:
+            result = self._items.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: FaceDetectionResult):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, key: str) -> bool:
+        # Membership only; does not count as a hit or refresh the entry.
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class PrefetchQueue:
+    """Frames waiting to be decoded ahead of get; at most `window` finished or running decodes
+    wait to be picked up at once, so decoded pixels stay bounded however long the request."""
+
+    def __init__(self, submit: Callable[..., Future], decode: Callable[[Any], Optional[DecodedFrame]],
+                 window: Optional[int] = None):
+        self._submit = submit
+        self._decode = decode
+        self._window = window
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, data: Any):
+        with self._lock:
+            self._items[key] = data
+
+    def discard(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def fill(self, decoding: Dict[str, Future]):
+        with self._lock:
+            while self._items and (self._window is None or len(decoding) < self._window):
+                key, data = self._items.popitem(last=False)
+                decoding[key] = self._submit(self._decode, data)
+
+
+class FrameContext:
+    """Per-request store so every check decodes and detects each frame once."""
+
+    def __init__(self, decode: Callable[..., Optional[DecodedFrame]],
+                 detect: Callable[..., FaceDetectionResult],
+                 cache: Optional[FrameCache] = None, keep_frames: bool = False,
+                 timings: Timings = NULL_TIMINGS,
+                 tracker_factory: Optional[Callable[[], FaceTracker]] = None):
+        self._decode = decode
+        self._detect = detect
+        self._tracker_factory = tracker_factory
+        self._cache = cache if cache is not None and cache.enabled else None
+        self.keep_frames = keep_frames
+        self.timings = timings
+        self._entries: Dict[Any, FrameEntry] = {}
+        # Decodes started by prefetch and not yet picked up by get.
+        self._decoding: Dict[str, Future] = {}
+        self._prefetch: Optional[PrefetchQueue] = None
+        # Keys last passed to prefetch_only; this context's own, not shared with forks.
+        self._planned: Set[str] = set()
+
+    def fork(self, detect: Callable[..., FaceDetectionResult],
+             tracker_factory: Optional[Callable[[], FaceTracker]] = None) -> "FrameContext":
+        """Context for another detector that shares this one's frames, decodes and timings."""
+        child = FrameContext(self._decode, detect, None, self.keep_frames, self.timings, tracker_factory)
+        child._cache = self._cache
+        child._entries = self._entries
+        child._decoding = self._decoding
+        child._prefetch = self._prefetch
+        return child
+
+    def prefetch(self, items: List[Any], submit: Callable[..., Future], window: Optional[int] = None):
+        """Start decoding items through submit (e.g. a thread pool's); get then only detects.
+
+        With a window, only that many decodes run ahead of get; the rest start in order as
+        get takes earlier ones."""
+        if self._prefetch is None:
+            self._prefetch = PrefetchQueue(submit, self._decode_timed, window)
+        for data in items:
+            key = frame_key(data)
+            if key in self._entries or key in self._decoding:
+                continue
+            if not self.keep_frames and self._cache is not None and key in self._cache:
+                continue
+            self._prefetch.add(key, data)
+        self._prefetch.fill(self._decoding)
+
+    def prefetch_only(self, items: List[Any]):
+        """Make items the frames this context wants decoded ahead, replacing the previous call's.
+
+        Queued or finished decodes from the previous call that are not in items are dropped,
+        so frames the caller has moved past neither run nor hold places in the window. Needs
+        an earlier prefetch() for the pool and window; until then this does nothing."""
+        if self._prefetch is None:
+            return
+        keys = [frame_key(data) for data in items]
+        for key in self._planned.difference(keys):
+            self._prefetch.discard(key)
+            pending = self._decoding.pop(key, None)
+            if pending is not None:
+                pending.cancel()
+        self._planned = set(keys)
+        for key, data in zip(keys, items):
+            if key in self._entries or key in self._decoding:
+                continue
+            self._prefetch.add(key, data)
+        self._prefetch.fill(self._decoding)
+
+    def _decode_timed(self, data: Any) -> Optional[DecodedFrame]:
+        timings = self.timings
+        start = timings.start()
+        decoded = self._decode(data, timings)
+        timings.stop('decode', start)
+        if decoded is None:
+            timings.count('decode_errors')
+        return decoded
+
+    def new_tracker(self) -> Optional[FaceTracker]:
+        return self._tracker_factory() if self._tracker_factory is not None else None
+
+    def get(self, data: Any, roi: Optional[Tuple[int, int, int, int]] = None,
+            tracker: Optional[FaceTracker] = None, keep_frame: bool = False) -> FrameEntry:
+        """tracker, if given, detects the frame as the next one of its sequence; keep_frame
+        keeps this frame's pixels even when the context does not keep every frame.
+
+        Tracked and ROI results only look for one face near where it was, so they are kept
+        apart from full-frame results and never enter the shared cache."""
+        key = frame_key(data)
+        full_frame = tracker is None and roi is None
+        entry_key = key if full_frame else (key, "track" if tracker is not None else roi)
+        entry = self._entries.get(entry_key)
+        if entry is not None and (entry.frame is not None or not keep_frame):
+            return entry
+        keep = self.keep_frames or keep_frame
+
+        timings = self.timings
+        if entry is not None:
+            result = entry.result
+        else:
+            result = self._cache.get(key) if self._cache is not None and full_frame else None
+        decoded = None
+        if result is None or keep:
+            pending = self._decoding.pop(key, None)
+            if self._prefetch is not None:
+                if pending is None:
+                    self._prefetch.discard(key)
+                self._prefetch.fill(self._decoding)
+            decoded = pending.result() if pending is not None else self._decode_timed(data)
+        if result is None and decoded is not None:
+            start = timings.start()
+            detect = tracker.track if tracker is not None else self._detect
+            result = detect(decoded[0], decoded[1], roi, timings)
+            timings.stop('detect', start)
+            timings.count('frames_processed')
+            if not result.detected:
+                timings.count('multi_face_rejects' if result.face_count > 1 else 'faces_missing')
+            if self._cache is not None and full_frame:
+                self._cache.put(key, result)
+
+        frame, original_size = decoded if decoded is not None else (None, None)
+        entry = FrameEntry(result=result, frame=frame if keep else None, original_size=original_size)
+        self._entries[entry_key] = entry
+        return entry
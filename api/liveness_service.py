@@ -1,11 +1,19 @@
-import cv2
 import numpy as np
 import base64
-from typing import Dict, List, Optional, Tuple, Any
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Any
 from dataclasses import dataclass
 
-from src.face_detector import FaceDetector
-from src.blink_detector import BlinkDetector
+from src.face_detector import FaceDetectionResult, FaceDetector, FaceTracker
+from src.blink_detector import BlinkDetector, BlinkSampler
+from src.embedding import EmbeddingResult
+from src.image_io import decode_image
+from api.detector_pool import DetectorPool
+from api.frame_context import DecodedFrame, FrameCache, FrameContext
+from api.metrics import NULL_TIMINGS, Timings
 
 
 @dataclass
@@ -14,12 +22,128 @@ class LivenessResult:
     confidence: float
     checks: Dict[str, Any]
     details: Dict[str, Any]
+    timings: Optional[Timings] = None
+    # Center-frame embedding, set by LivenessService.verify.
+    embedding: Optional[EmbeddingResult] = None
+
+
+PASS_THRESHOLD = 0.70
+POSE_KEYS = ['right', 'left', 'center']
+
+
+def default_parallelism() -> int:
+    # One request has at most four independent checks: three poses and the blink burst.
+    return int(os.environ.get("LIVENESS_PARALLEL", 0)) or min(4, os.cpu_count() or 1)
+
+
+def max_reachable_confidence(total_confidence: float, check_count: int) -> float:
+    # Best verdict once every pose and blink check has run: a face consistency score of 1.0.
+    # Failed checks are left out of the mean rather than counted as 0, so while any of those
+    # checks is still to run a 1.0 from it keeps this at 0.75 or more; fail-fast can therefore
+    # only skip face consistency, when no check passed or the passing ones average below 0.4.
+    best = total_confidence / check_count if check_count > 0 else 0.0
+    return (best + 1.0) / 2
+
+
+class BlinkSession:
+    """Incremental blink check fed one frame at a time; holds a pooled detector until closed."""
+
+    def __init__(self, service: "LivenessService", face_detector: FaceDetector):
+        self._service = service
+        self._face_detector = face_detector
+        self._tracker = service.new_tracker(face_detector)
+        self._roi = None
+        self.blink_detector = BlinkDetector()
+        self.frames_received = 0
+        self.frames_processed = 0
+
+    @property
+    def blinked(self) -> bool:
+        return self.blink_detector.blink_count >= 1
+
+    def feed(self, data: Any) -> Dict[str, Any]:
+        index = self.frames_received
+        self.frames_received += 1
+
+        decoded = self._service.decode_for_detection(data)
+        if decoded is None:
+            return {'index': index, 'face_detected': False, 'error': 'Failed to decode image',
+                    'blink_count': self.blink_detector.blink_count}
+
+        if self._tracker is not None:
+            result = self._tracker.track(decoded[0], decoded[1])
+        else:
+            result = self._face_detector.detect(decoded[0], decoded[1], self._roi)
+        if not result.detected:
+            self._roi = None
+            return {'index': index, 'face_detected': False, 'error': result.error_message,
+                    'blink_count': self.blink_detector.blink_count}
+
+        if self._tracker is None and self._service.blink_roi:
+            self._roi = FaceDetector.expand_roi(result.bbox)
+        self.frames_processed += 1
+        blink = self.blink_detector.detect(result.left_eye_landmarks, result.right_eye_landmarks)
+        return {
+            'index': index,
+            'face_detected': True,
+            'ear': round(blink.ear_avg, 4),
+            'status': blink.liveness_status.value,
+            'blink_count': blink.blink_count
+        }
+
+    def result(self) -> Dict[str, Any]:
+        blink_count = self.blink_detector.blink_count
+        is_valid = blink_count >= 1
+        return {
+            'valid': is_valid,
+            'blink_count': blink_count,
+            'frames_processed': self.frames_processed,
+            'confidence': 1.0 if is_valid else 0.0
+        }
+
+    def close(self):
+        if self._face_detector is not None:
+            self._service.detector_pool.release(self._face_detector)
+            self._face_detector = None
 
 
 class LivenessService:
-    def __init__(self):
-        self.face_detector = None
-        self.blink_detector = None
+    def __init__(self, frame_cache_size: Optional[int] = None, pool_size: Optional[int] = None,
+                 max_side: Optional[int] = None, blink_roi: Optional[bool] = None,
+                 blink_tracking: Optional[bool] = None, parallel: Optional[int] = None,
+                 blink_stride: Optional[int] = None):
+        if pool_size is None:
+            pool_size = (int(os.environ.get("LIVENESS_POOL_SIZE", 0))
+                         or int(os.environ.get("LIVENESS_WORKERS", 0))
+                         or os.cpu_count() or 1)
+        self.pool_size = pool_size
+        self.detector_pool = None
+
+        if frame_cache_size is None:
+            frame_cache_size = int(os.environ.get("LIVENESS_FRAME_CACHE_SIZE", 0))
+        self.frame_cache = FrameCache(frame_cache_size)
+
+        # Landmark geometry is scale-invariant, so frames are downscaled before inference.
+        if max_side is None:
+            max_side = int(os.environ.get("LIVENESS_MAX_SIDE", 640))
+        self.max_side = max_side or None
+        if blink_roi is None:
+            blink_roi = os.environ.get("LIVENESS_BLINK_ROI", "1") == "1"
+        self.blink_roi = blink_roi
+        if blink_tracking is None:
+            blink_tracking = os.environ.get("LIVENESS_BLINK_TRACKING", "1") == "1"
+        self.blink_tracking = blink_tracking
+        # Long blink bursts are sampled every blink_stride frames and only processed densely
+        # around EAR dips; 1 runs face mesh on every frame.
+        if blink_stride is None:
+            blink_stride = int(os.environ.get("LIVENESS_BLINK_STRIDE", 2))
+        self.blink_stride = max(1, blink_stride)
+
+        # Detectors one request may use at once; extra ones are only taken when idle.
+        self.parallel = max(1, parallel if parallel is not None else default_parallelism())
+        self._fan_out_lock = threading.Lock()
+        self._decode_pool: Optional[ThreadPoolExecutor] = None
+        self._check_pool: Optional[ThreadPoolExecutor] = None
         
         self.pose_thresholds = {
             'right': {'yaw_min': 5, 'yaw_max': 100},
@@ -28,24 +152,134 @@ class LivenessService:
         }
     
     def _ensure_loaded(self):
-        if self.face_detector is None:
-            self.face_detector = FaceDetector()
-            self.blink_detector = BlinkDetector()
+        if self.detector_pool is None:
+            self.detector_pool = DetectorPool(self.pool_size, self._create_detector)
+
+    def _create_detector(self) -> FaceDetector:
+        return FaceDetector(max_side=self.max_side)
+
+    def warm_up(self) -> int:
+        """Create every pooled detector and run one inference on each, so the first request does not."""
+        self._ensure_loaded()
+        blank = np.zeros((480, 640, 3), dtype=np.uint8)
+        detectors = [self.detector_pool.acquire() for _ in range(self.pool_size)]
+        try:
+            for face_detector in detectors:
+                face_detector.detect(blank)
+                face_detector.track(blank)
+        finally:
+            for face_detector in detectors:
+                self.detector_pool.release(face_detector)
+        return len(detectors)
+
+    @property
+    def model_loaded(self) -> bool:
+        return self.detector_pool is not None and self.detector_pool.created > 0
+
+    def open_blink_session(self, timeout: Optional[float] = None) -> BlinkSession:
+        self._ensure_loaded()
+        return BlinkSession(self, self.detector_pool.acquire(timeout))
+
+    def new_tracker(self, face_detector: FaceDetector) -> Optional[FaceTracker]:
+        if not self.blink_tracking:
+            return None
+        return FaceTracker(face_detector, roi_margin=0.5 if self.blink_roi else None)
+
+    def new_context(self, face_detector: FaceDetector, keep_frames: bool = False,
+                    timings: Timings = NULL_TIMINGS) -> FrameContext:
+        return FrameContext(self.decode_for_detection, face_detector.detect, self.frame_cache, keep_frames, timings,
+                            lambda: self.new_tracker(face_detector))
+
+    def _fan_out_pools(self) -> Tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+        with self._fan_out_lock:
+            if self._decode_pool is None:
+                # cv2.imdecode and FaceMesh.process release the GIL, so threads use separate cores.
+                self._decode_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                       thread_name_prefix="liveness-decode")
+                # A lane needs a spare detector, so there are never more lanes than detectors.
+                self._check_pool = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="liveness-check")
+            return self._decode_pool, self._check_pool
+
+    def _run_checks_parallel(self, frames: Dict[str, Any], ctx: FrameContext) -> Dict[str, Dict[str, Any]]:
+        """Pose and blink checks spread over idle pooled detectors, after decoding every frame in parallel.
+
+        The blink burst stays on the request's own detector (its tracker needs one detector
+        for the whole sequence); poses go to spare detectors, or follow it when none is idle.
+        """
+        decode_pool, check_pool = self._fan_out_pools()
+        blink_frames = frames.get('blink')
+        if blink_frames is not None and not isinstance(blink_frames, list):
+            blink_frames = [blink_frames]
+        poses = [pose for pose in POSE_KEYS if pose in frames]
+        prefetch = list(blink_frames or [])
+        if self.blink_stride > 1 and len(prefetch) > self.blink_stride:
+            # Sampled bursts are prefetched by _validate_blink_sampled as the sampler moves.
+            prefetch = []
+        # One frame in detection and one decoded ahead per lane, not the whole burst at once.
+        ctx.prefetch([frames[pose] for pose in poses] + prefetch, decode_pool.submit, window=2 * self.parallel)
+
+        spares = []
+        while len(spares) < min(self.parallel - 1, len(poses)):
+            face_detector = self.detector_pool.try_acquire()
+            if face_detector is None:
+                break
+            spares.append(face_detector)
+        futures: List[Future] = []
+        try:
+            contexts = [ctx] + [ctx.fork(d.detect, lambda d=d: self.new_tracker(d)) for d in spares]
+            lanes: List[List[str]] = [[] for _ in contexts]
+            if blink_frames is not None:
+                lanes[0].append('blink')
+            for i, pose in enumerate(poses):
+                lanes[1 + i % len(spares) if spares else 0].append(pose)
+
+            def run_lane(lane: List[str], lane_ctx: FrameContext) -> Dict[str, Dict[str, Any]]:
+                return {name: self.validate_blink(blink_frames, lane_ctx) if name == 'blink'
+                        else self.validate_pose(frames[name], name, lane_ctx) for name in lane}
+
+            for lane, lane_ctx in zip(lanes[1:], contexts[1:]):
+                futures.append(check_pool.submit(run_lane, lane, lane_ctx))
+            results = run_lane(lanes[0], ctx)
+            for future in futures:
+                results.update(future.result())
+            return results
+        finally:
+            # A spare goes back to the pool only once its lane is done with it, even if lane 0 raised.
+            wait(futures)
+            for face_detector in spares:
+                self.detector_pool.release(face_detector)
+
+    @contextmanager
+    def checkout(self, keep_frames: bool = False, timings: Timings = NULL_TIMINGS) -> Iterator[FrameContext]:
+        self._ensure_loaded()
+        with self.detector_pool.checkout() as face_detector:
+            yield self.new_context(face_detector, keep_frames, timings)
     
-    def decode_base64(self, base64_str: str) -> Optional[np.ndarray]:
+    def decode_for_detection(self, data: Any, timings: Timings = NULL_TIMINGS) -> Optional[DecodedFrame]:
         try:
-            img_data = base64.b64decode(base64_str)
-            nparr = np.frombuffer(img_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            return img
+            img_data = data
+            if isinstance(data, str):
+                start = timings.start()
+                img_data = base64.b64decode(data)
+                timings.stop('base64', start)
+            return decode_image(img_data, self.max_side)
         except Exception as e:
             print(f"Decode error: {e}")
             return None
     
-    def validate_pose(self, frame_b64: str, expected_pose: str) -> Dict[str, Any]:
-        self._ensure_loaded()
-        frame = self.decode_base64(frame_b64)
-        if frame is None:
+    def validate_pose(self, frame_b64: str, expected_pose: str, ctx: Optional[FrameContext] = None) -> Dict[str, Any]:
+        if ctx is None:
+            with self.checkout() as ctx:
+                return self.validate_pose(frame_b64, expected_pose, ctx)
+
+        result = ctx.get(frame_b64).result
+        start = ctx.timings.start()
+        check = self._score_pose(result, expected_pose)
+        ctx.timings.stop('pose', start)
+        return check
+
+    def _score_pose(self, result: Optional[FaceDetectionResult], expected_pose: str) -> Dict[str, Any]:
+        if result is None:
             return {
                 'valid': False,
                 'expected': expected_pose,
@@ -54,8 +288,6 @@ class LivenessService:
                 'error': 'Failed to decode image'
             }
         
-        result = self.face_detector.detect(frame)
-        
         if not result.detected:
             return {
                 'valid': False,
@@ -110,46 +342,149 @@ class LivenessService:
             'pitch': round(pose.pitch, 2)
         }
     
-    def validate_blink(self, frames_b64: List[str]) -> Dict[str, Any]:
-        self._ensure_loaded()
-        self.blink_detector.reset()
+    def validate_blink(self, frames_b64: List[str], ctx: Optional[FrameContext] = None,
+                       fail_fast: bool = False) -> Dict[str, Any]:
+        if ctx is None:
+            with self.checkout() as ctx:
+                return self.validate_blink(frames_b64, ctx, fail_fast)
+
+        blink_detector = BlinkDetector()
+        if self.blink_stride > 1 and len(frames_b64) > self.blink_stride:
+            return self._validate_blink_sampled(frames_b64, ctx, blink_detector, fail_fast)
+        if fail_fast:
+            return self._validate_blink_fail_fast(frames_b64, ctx, blink_detector)
         
-        blink_count = 0
-        frames_processed = 0
+        left_eyes = []
+        right_eyes = []
         
+        for result in self._blink_faces(frames_b64, ctx):
+            if result is None:
+                continue
+            
+            left_eyes.append(result.left_eye_landmarks)
+            right_eyes.append(result.right_eye_landmarks)
+        
+        frames_processed = len(left_eyes)
+        if frames_processed:
+            start = ctx.timings.start()
+            blink_detector.detect_batch(np.stack(left_eyes), np.stack(right_eyes))
+            ctx.timings.stop('blink', start)
+        blink_count = blink_detector.blink_count
+        
+        is_valid = blink_count >= 1
+        confidence = min(1.0, blink_count / 1.0) if is_valid else 0.0
+        
+        return {
+            'valid': is_valid,
+            'blink_count': blink_count,
+            'frames_processed': frames_processed,
+            'confidence': round(confidence, 3)
+        }
+
+    def _blink_faces(self, frames_b64: List[Any], ctx: FrameContext) -> Iterator[Optional[FaceDetectionResult]]:
+        # Yields one detection per frame (None when no usable face). With blink_tracking, frames
+        # after the first are tracked from the previous one instead of fully detected; without
+        # it, blink_roi crops each frame around the previous face.
+        tracker = ctx.new_tracker()
+        roi = None
         for frame_b64 in frames_b64:
-            frame = self.decode_base64(frame_b64)
-            if frame is None:
+            result = ctx.get(frame_b64, roi, tracker).result
+            if result is None or not result.detected:
+                roi = None
+                yield None
                 continue
+            if tracker is None and self.blink_roi:
+                roi = FaceDetector.expand_roi(result.bbox)
+            yield result
+
+    def _validate_blink_sampled(self, frames_b64: List[Any], ctx: FrameContext, blink_detector: BlinkDetector,
+                                fail_fast: bool) -> Dict[str, Any]:
+        # Same roi/tracker handling as _blink_faces, but frames are visited in the sampler's order.
+        tracker = ctx.new_tracker()
+        roi = None
+
+        def get_eyes(i: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+            nonlocal roi
+            result = ctx.get(frames_b64[i], roi, tracker).result
+            if result is None or not result.detected:
+                roi = None
+                return None
+            if tracker is None and self.blink_roi:
+                roi = FaceDetector.expand_roi(result.bbox)
+            return result.left_eye_landmarks, result.right_eye_landmarks
+
+        def upcoming(plan: List[int]):
+            ctx.prefetch_only([frames_b64[i] for i in plan])
+
+        sampler = BlinkSampler(blink_detector, self.blink_stride)
+        try:
+            blink_count = sampler.run(len(frames_b64), get_eyes, fail_fast=fail_fast,
+                                      upcoming=upcoming, ahead=2 * self.parallel)
+        finally:
+            ctx.prefetch_only([])
+        frames_skipped = len(frames_b64) - sampler.frames_looked
+        ctx.timings.count('blink_frames_skipped', frames_skipped)
+        is_valid = blink_count >= 1
+
+        return {
+            'valid': is_valid,
+            'blink_count': blink_count,
+            'frames_processed': sampler.frames_processed,
+            'frames_skipped': frames_skipped,
+            'confidence': 1.0 if is_valid else 0.0
+        }
+
+    def _validate_blink_fail_fast(self, frames_b64: List[str], ctx: FrameContext,
+                                  blink_detector: BlinkDetector) -> Dict[str, Any]:
+        # Frames are fed one at a time so decoding stops as soon as the outcome is settled:
+        # either a blink was seen or too few frames remain to complete one.
+        frames_processed = 0
+        frames_skipped = 0
+        faces = self._blink_faces(frames_b64, ctx)
+        for i in range(len(frames_b64)):
+            remaining = len(frames_b64) - i
+            if blink_detector.blink_count >= 1 or remaining < blink_detector.frames_to_blink():
+                frames_skipped = remaining
+                break
             
-            result = self.face_detector.detect(frame)
-            if not result.detected:
+            result = next(faces)
+            if result is None:
                 continue
             
             frames_processed += 1
-            blink_result = self.blink_detector.detect(result.left_eye_landmarks, result.right_eye_landmarks)
-            
-            if blink_result and blink_result.blink_count > blink_count:
-                blink_count = blink_result.blink_count
+            start = ctx.timings.start()
+            blink_detector.detect(result.left_eye_landmarks, result.right_eye_landmarks)
+            ctx.timings.stop('blink', start)
         
+        blink_count = blink_detector.blink_count
         is_valid = blink_count >= 1
-        confidence = min(1.0, blink_count / 1.0) if is_valid else 0.0
         
         return {
             'valid': is_valid,
             'blink_count': blink_count,
             'frames_processed': frames_processed,
-            'confidence': round(confidence, 3)
+            'frames_skipped': frames_skipped,
+            'confidence': 1.0 if is_valid else 0.0
         }
     
-    def validate_liveness(self, frames: Dict[str, Any]) -> LivenessResult:
-        self._ensure_loaded()
+    def validate_liveness(self, frames: Dict[str, Any], ctx: Optional[FrameContext] = None,
+                          fail_fast: bool = False, timings: Timings = NULL_TIMINGS) -> LivenessResult:
+        if ctx is None:
+            with self.checkout(timings=timings) as ctx:
+                return self.validate_liveness(frames, ctx, fail_fast)
+
         checks = {}
+        skipped = []
         all_valid = True
         total_confidence = 0.0
         check_count = 0
         
-        pose_keys = ['right', 'left', 'center']
+        pose_keys = POSE_KEYS
+        # Fail-fast stops the blink scan frame by frame and skips from earlier results, so it stays sequential.
+        precomputed = {}
+        if not fail_fast and self.parallel > 1:
+            precomputed = self._run_checks_parallel(frames, ctx)
+        
         for pose in pose_keys:
             if pose not in frames:
                 checks[f'pose_{pose}'] = {
@@ -159,7 +494,7 @@ class LivenessService:
                 all_valid = False
                 continue
             
-            result = self.validate_pose(frames[pose], pose)
+            result = precomputed.get(pose) or self.validate_pose(frames[pose], pose, ctx)
             checks[f'pose_{pose}'] = result
             
             if not result['valid']:
@@ -179,7 +514,7 @@ class LivenessService:
             if not isinstance(blink_frames, list):
                 blink_frames = [blink_frames]
             
-            result = self.validate_blink(blink_frames)
+            result = precomputed.get('blink') or self.validate_blink(blink_frames, ctx, fail_fast)
             checks['blink'] = result
             
             if not result['valid']:
@@ -190,31 +525,83 @@ class LivenessService:
         
         overall_confidence = total_confidence / check_count if check_count > 0 else 0.0
         
-        face_consistency = self._check_face_consistency(frames)
-        checks['face_consistency'] = face_consistency
+        if fail_fast and max_reachable_confidence(total_confidence, check_count) < PASS_THRESHOLD:
+            skipped.append('face_consistency')
+            face_consistency = {'valid': False}
+        else:
+            start = ctx.timings.start()
+            face_consistency = self._check_face_consistency(frames, ctx)
+            ctx.timings.stop('consistency', start)
+            checks['face_consistency'] = face_consistency
         
         if face_consistency['valid']:
             overall_confidence = (overall_confidence + face_consistency['confidence']) / 2
         
-        is_real = overall_confidence >= 0.70
+        for name in skipped:
+            checks[name] = {
+                'valid': False,
+                'skipped': True,
+                'error': 'Skipped, threshold no longer reachable'
+            }
+        
+        is_real = overall_confidence >= PASS_THRESHOLD
+        
+        details = {
+            'total_checks': check_count + 1,
+            'passed_checks': sum(1 for c in checks.values() if c.get('valid', False)),
+            'threshold': PASS_THRESHOLD,
+            'anti_spoofing': {
+                'head_movement': all([checks.get(f'pose_{p}', {}).get('valid', False) for p in pose_keys]),
+                'blink_detected': checks.get('blink', {}).get('valid', False),
+                'face_consistency': face_consistency['valid']
+            }
+        }
+        if fail_fast:
+            details['fail_fast'] = True
+            details['skipped_checks'] = skipped
         
         return LivenessResult(
             is_real=is_real,
             confidence=round(overall_confidence, 3),
             checks=checks,
-            details={
-                'total_checks': check_count + 1,
-                'passed_checks': sum(1 for c in checks.values() if c.get('valid', False)),
-                'threshold': 0.70,
-                'anti_spoofing': {
-                    'head_movement': all([checks.get(f'pose_{p}', {}).get('valid', False) for p in pose_keys]),
-                    'blink_detected': checks.get('blink', {}).get('valid', False),
-                    'face_consistency': face_consistency['valid']
-                }
-            }
+            details=details,
+            timings=ctx.timings if ctx.timings.enabled else None
         )
     
-    def _check_face_consistency(self, frames: Dict[str, Any]) -> Dict[str, Any]:
+    def verify(self, frames: Dict[str, Any], embed: Callable[[np.ndarray, np.ndarray, Timings], Future],
+               fail_fast: bool = False, timings: Timings = NULL_TIMINGS) -> LivenessResult:
+        """validate_liveness plus an embedding of the center frame.
+
+        The center frame is detected first and its landmarks go straight to embed (e.g.
+        EmbeddingBatcher.submit), which runs while the remaining checks do; the pose check
+        then reuses the same detection, so every frame gets one mesh pass. embed records
+        its stages into the request's timings.
+        """
+        with self.checkout(timings=timings) as ctx:
+            future = None
+            if 'center' in frames:
+                entry = ctx.get(frames['center'], keep_frame=True)
+                face = entry.result
+                if face is not None and face.detected and entry.frame is not None:
+                    # Landmarks are in full-resolution coordinates, the kept frame may be reduced.
+                    fh, fw = entry.frame.shape[:2]
+                    ow, oh = entry.original_size
+                    future = embed(entry.frame, face.landmarks * (fw / ow, fh / oh), timings)
+
+            result = self.validate_liveness(frames, ctx, fail_fast)
+            if future is None:
+                result.embedding = EmbeddingResult(success=False, error_message="No face detected in center frame")
+            else:
+                start = timings.start()
+                result.embedding = future.result()
+                timings.stop('embed_wait', start)
+        return result
+
+    def _check_face_consistency(self, frames: Dict[str, Any], ctx: Optional[FrameContext] = None) -> Dict[str, Any]:
+        if ctx is None:
+            with self.checkout() as ctx:
+                return self._check_face_consistency(frames, ctx)
+
         face_sizes = []
         
         for key in ['left', 'right', 'center']:
@@ -223,12 +610,8 @@ class LivenessService:
             if not frame_data:
                 continue
             
-            frame = self.decode_base64(frame_data)
-            if frame is None:
-                continue
-            
-            result = self.face_detector.detect(frame)
-            if result.detected and result.bbox:
+            result = ctx.get(frame_data).result
+            if result is not None and result.detected and result.bbox:
                 x, y, w, h = result.bbox
                 face_sizes.append(w * h)
         
@@ -239,8 +622,8 @@ class LivenessService:
                 'error': 'Not enough faces for consistency check, assuming valid'
             }
         
-        avg_size = np.mean(face_sizes)
-        std_size = np.std(face_sizes)
+        avg_size = float(np.mean(face_sizes))
+        std_size = float(np.std(face_sizes))
         
         variation = std_size / avg_size if avg_size > 0 else 0.0
         
@@ -1,15 +1,114 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
+from pydantic import BaseModel, ValidationError
+
+from api.models import (LivenessRequest, LivenessResponse, HealthResponse, ReadinessResponse,
+                        VerifyRequest, VerifyResponse)
+from api.binary_frames import BLINK_SLOT, POSE_SLOTS, parse_frames
+from api.errors import ExecutorSaturated, PoolTimeout
+from api.metrics import metrics
+from api.payload import PayloadLimits, PayloadTooLarge, read_body, read_form, read_json
+
+
+FAST_STARTUP = os.environ.get("LIVENESS_FAST_STARTUP", "1") == "1"
+FAIL_FAST_DEFAULT = os.environ.get("LIVENESS_FAIL_FAST", "0") == "1"
+WS_MAX_FRAMES = int(os.environ.get("LIVENESS_WS_MAX_FRAMES", 150))
+WS_ACQUIRE_TIMEOUT = float(os.environ.get("LIVENESS_WS_ACQUIRE_TIMEOUT", 5))
+WS_IDLE_TIMEOUT = float(os.environ.get("LIVENESS_WS_IDLE_TIMEOUT", 10))
+# 0 = half of the detector pool, so streaming clients cannot starve the HTTP endpoints.
+WS_MAX_SESSIONS = int(os.environ.get("LIVENESS_WS_MAX_SESSIONS", 0))
+WARMUP = os.environ.get("LIVENESS_WARMUP", "1") == "1"
+TIMING_DETAILS_DEFAULT = os.environ.get("LIVENESS_TIMING_DETAILS", "0") == "1"
+PAYLOAD_LIMITS = PayloadLimits.from_env()
+
+# The executor, liveness service and embedding model import cv2, numpy and onnxruntime
+# (mediapipe follows with the first detector), so they are set by load_services() instead
+# of at module load; endpoints that need them await services().
+executor: Any = None
+liveness_service: Any = None
+ws_sessions: Optional[asyncio.Semaphore] = None
+identity_store: Any = None
+_services: Optional[asyncio.Task] = None
+startup: Dict[str, Any] = {'ready': False, 'import_ms': None, 'warm_up_ms': None, 'detectors': 0,
+                           'embedding_loaded': False}
+
+
+def import_services() -> Dict[str, Any]:
+    from api.executor import LivenessExecutor
+    from api.liveness_service import liveness_service
+    from api.verification import load_identity_store
+    return {'executor': LivenessExecutor.from_env(), 'liveness_service': liveness_service,
+            'identity_store': load_identity_store()}
+
+
+async def load_services():
+    global executor, liveness_service, identity_store
+    start = time.perf_counter()
+    loaded = await run_in_threadpool(import_services)
+    executor = loaded['executor']
+    liveness_service = loaded['liveness_service']
+    identity_store = loaded['identity_store']
+    startup['import_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    print(f"Services loaded in {startup['import_ms']} ms "
+          f"(executor={executor.backend}, workers={executor.workers}, queue={executor.max_queue})")
+
+
+async def services():
+    """Wait until load_services() has run, starting it if the lifespan did not."""
+    global _services
+    if _services is None:
+        _services = asyncio.create_task(load_services())
+    await asyncio.shield(_services)
+
+
+async def warm_up():
+    start = time.perf_counter()
+    try:
+        # Process workers load their own models, so the API process loads none here.
+        startup['detectors'], startup['embedding_loaded'] = await executor.warm_up()
+        startup['ready'] = True
+    except Exception as e:
+        startup['error'] = str(e)
+        print(f"Warm-up failed: {e}")
+    startup['warm_up_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    print(f"Warm-up done in {startup['warm_up_ms']} ms: {startup['detectors']} detectors, "
+          f"embedding={'loaded' if startup['embedding_loaded'] else 'unavailable'}")
+
 
-from api.models import LivenessRequest, LivenessResponse, HealthResponse
-from api.liveness_service import liveness_service
+async def start_services():
+    try:
+        await services()
+    except Exception as e:
+        startup['error'] = str(e)
+        print(f"Loading services failed: {e}")
+        raise
+    if WARMUP:
+        await warm_up()
+    else:
+        startup['ready'] = True
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("API starting...")
+    print(f"API starting... (fast_startup={FAST_STARTUP})")
+    # Runs in the background so /health answers while modules load and detectors warm up;
+    # /ready flips when it finishes. Without fast startup, serving waits for the imports.
+    if not FAST_STARTUP:
+        await services()
+    task = asyncio.create_task(start_services())
     yield
+    task.cancel()
+    if executor is not None:
+        executor.shutdown()
     print("API shutting down...")
 
 
@@ -31,16 +130,129 @@ app.add_middleware(
 
 @app.get("/health", response_model=HealthResponse)
 async def health():
-    model_loaded = liveness_service.face_detector is not None
+    # Answers before load_services() has finished; executor is None until then.
+    if executor is None:
+        return HealthResponse(status="ok", service="liveness-detection", ready=startup['ready'])
+    model_loaded = executor.model_loaded or liveness_service.model_loaded
     return HealthResponse(
         status="ok",
         model_loaded=model_loaded,
-        service="liveness-detection"
+        service="liveness-detection",
+        ready=startup['ready'],
+        executor=executor.stats()
+    )
+
+
+@app.get("/ready", response_model=ReadinessResponse)
+async def ready():
+    """
+    Readiness probe: 200 setelah semua model dimuat dan warm-up selesai, 503 sebelumnya.
+    """
+    response = ReadinessResponse(**startup)
+    if not startup['ready']:
+        return JSONResponse(status_code=503, content=response.model_dump())
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Metrics format teks Prometheus: histogram latency per tahap, counter frame, dan gauge executor.
+    """
+    gauges = [('liveness_ready', "1 after model warm-up has finished", int(startup['ready']))]
+    stats = executor.stats() if executor is not None else {}
+    if stats:
+        gauges.append(('liveness_executor_pending', "Requests running or queued in the executor", stats['pending']))
+        gauges.append(('liveness_executor_capacity', "Requests the executor admits before answering 503",
+                       executor.capacity))
+    pool = stats.get('detector_pool')
+    if pool is not None:
+        gauges.append(('liveness_detector_pool_in_use', "FaceDetectors currently checked out", pool['in_use']))
+        gauges.append(('liveness_detector_pool_created', "FaceDetectors created so far", pool['created']))
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+
+async def run_liveness(frames: Dict[str, Any], fail_fast: Optional[bool], include_timings: Optional[bool] = None):
+    start = time.perf_counter()
+    try:
+        await services()
+        fail_fast = FAIL_FAST_DEFAULT if fail_fast is None else fail_fast
+        include_timings = TIMING_DETAILS_DEFAULT if include_timings is None else include_timings
+        result = await executor.validate_liveness(frames, fail_fast, metrics.enabled or include_timings)
+        metrics.record(result.timings)
+        metrics.record_request('real' if result.is_real else 'fake', time.perf_counter() - start)
+        
+        message = "Wajah asli terdeteksi" if result.is_real else "Wajah palsu terdeteksi (foto/video)"
+        details = with_timings(result.details, result, include_timings, start)
+        
+        return LivenessResponse(
+            success=True,
+            is_real=result.is_real,
+            confidence=result.confidence,
+            checks=result.checks,
+            message=message,
+            details=details
+        )
+    
+    except ExecutorSaturated as e:
+        metrics.record_request('rejected', time.perf_counter() - start)
+        return JSONResponse(
+            status_code=503,
+            content=LivenessResponse(success=False, message=str(e)).model_dump(),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    except Exception as e:
+        metrics.record_request('error', time.perf_counter() - start)
+        return error_response(e)
+
+
+def with_timings(details: Dict[str, Any], result: Any, include_timings: bool, start: float) -> Dict[str, Any]:
+    if not include_timings or result.timings is None:
+        return details
+    return {**details, 'timings': {
+        **result.timings.breakdown(),
+        'total_ms': round((time.perf_counter() - start) * 1000, 3)
+    }}
+
+
+def json_body(model: type) -> Dict[str, Any]:
+    # JSON bodies are streamed through api.payload rather than parsed by FastAPI, so the
+    # request schema is declared for the OpenAPI docs here.
+    return {"requestBody": {"required": True,
+                            "content": {"application/json": {"schema": model.model_json_schema()}}}}
+
+
+async def read_model(request: Request, model: type) -> Any:
+    """Stream and validate a JSON body; frames arrive as image bytes, already base64-decoded."""
+    try:
+        body = await read_json(request, PAYLOAD_LIMITS)
+    except ValueError as e:
+        raise RequestValidationError([{'type': 'json_invalid', 'loc': ('body',), 'msg': 'JSON decode error',
+                                       'ctx': {'error': str(e)}}])
+    try:
+        return model.model_validate(body)
+    except ValidationError as e:
+        raise RequestValidationError([{**error, 'loc': ('body', *error['loc'])}
+                                      for error in e.errors(include_url=False, include_input=False)])
+
+
+def too_large(response: BaseModel) -> JSONResponse:
+    return JSONResponse(status_code=413, content=response.model_dump())
+
+
+def error_response(e: Exception) -> LivenessResponse:
+    return LivenessResponse(
+        success=False,
+        is_real=False,
+        confidence=0.0,
+        checks={},
+        message=f"Error: {str(e)}"
     )
 
 
-@app.post("/api/liveness/validate", response_model=LivenessResponse)
-async def validate_liveness(req: LivenessRequest):
+@app.post("/api/liveness/validate", response_model=LivenessResponse, openapi_extra=json_body(LivenessRequest))
+async def validate_liveness(request: Request):
     """
     Validasi apakah wajah asli atau palsu (foto/video).
     
@@ -56,29 +268,211 @@ async def validate_liveness(req: LivenessRequest):
     - is_real: true jika wajah asli, false jika palsu
     - confidence: 0.0 - 1.0
     - checks: detail validasi setiap step
+    
+    Set `fail_fast: true` untuk menghentikan pemrosesan begitu hasil akhir sudah pasti;
+    check yang dilewati dilaporkan di `details.skipped_checks`.
+    
+    Body dibaca secara streaming: setiap frame base64 langsung di-decode saat diterima.
+    Request yang melebihi batas ukuran/jumlah frame ditolak dengan 413.
     """
     try:
-        result = liveness_service.validate_liveness(req.frames)
-        
-        message = "Wajah asli terdeteksi" if result.is_real else "Wajah palsu terdeteksi (foto/video)"
-        
-        return LivenessResponse(
-            success=True,
-            is_real=result.is_real,
-            confidence=result.confidence,
-            checks=result.checks,
-            message=message,
-            details=result.details
-        )
+        req = await read_model(request, LivenessRequest)
+    except PayloadTooLarge as e:
+        return too_large(LivenessResponse(success=False, message=str(e)))
+    return await run_liveness(req.frames, req.fail_fast, req.include_timings)
+
+
+@app.post("/api/liveness/validate/multipart", response_model=LivenessResponse)
+async def validate_liveness_multipart(request: Request, fail_fast: Optional[bool] = None,
+                                      include_timings: Optional[bool] = None):
+    """
+    Sama seperti /api/liveness/validate, tetapi frame dikirim sebagai file
+    multipart/form-data (bytes JPEG/PNG mentah, tanpa base64).
     
+    Field: left, right, center (satu file), blink (boleh diulang, urut sesuai waktu capture).
+    """
+    try:
+        form = await read_form(request, PAYLOAD_LIMITS)
+        frames: Dict[str, Any] = {}
+        for slot in POSE_SLOTS:
+            part = form.get(slot)
+            if part is not None:
+                frames[slot] = await read_part(part)
+        blink_parts = form.getlist(BLINK_SLOT)
+        if blink_parts:
+            frames[BLINK_SLOT] = [await read_part(part) for part in blink_parts]
+        PAYLOAD_LIMITS.check_frames(frames)
+    except PayloadTooLarge as e:
+        return too_large(LivenessResponse(success=False, message=str(e)))
     except Exception as e:
-        return LivenessResponse(
-            success=False,
-            is_real=False,
-            confidence=0.0,
-            checks={},
-            message=f"Error: {str(e)}"
+        return error_response(e)
+    return await run_liveness(frames, fail_fast, include_timings)
+
+
+@app.post("/api/liveness/validate/binary", response_model=LivenessResponse)
+async def validate_liveness_binary(request: Request, fail_fast: Optional[bool] = None,
+                                   include_timings: Optional[bool] = None):
+    """
+    Sama seperti /api/liveness/validate dengan body application/octet-stream.
+    
+    Body berisi record berurutan: 1 byte panjang nama slot, nama slot (ASCII),
+    4 byte panjang payload (big-endian), lalu bytes gambar. Slot `blink` boleh diulang.
+    """
+    try:
+        frames = parse_frames(await read_body(request, PAYLOAD_LIMITS))
+        PAYLOAD_LIMITS.check_frames(frames)
+    except PayloadTooLarge as e:
+        return too_large(LivenessResponse(success=False, message=str(e)))
+    except Exception as e:
+        return error_response(e)
+    return await run_liveness(frames, fail_fast, include_timings)
+
+
+@app.post("/api/verify", response_model=VerifyResponse, openapi_extra=json_body(VerifyRequest))
+async def verify(request: Request):
+    """
+    Liveness + verifikasi wajah dalam satu request.
+    
+    Frames sama seperti /api/liveness/validate. Landmark frame `center` dari pengecekan
+    pose langsung dipakai untuk align + embedding ArcFace (tanpa deteksi ulang), dan
+    embedding berjalan bersamaan dengan pengecekan blink. Embedding dibandingkan dengan
+    identitas `identity_id` di galeri (IDENTITY_GALLERY).
+    
+    Response:
+    - verified: true jika wajah asli DAN similarity >= threshold
+    - similarity: cosine similarity dengan embedding terdaftar
+    """
+    try:
+        req = await read_model(request, VerifyRequest)
+    except PayloadTooLarge as e:
+        return too_large(VerifyResponse(success=False, message=str(e)))
+    start = time.perf_counter()
+    try:
+        await services()
+    except Exception as e:
+        return VerifyResponse(success=False, identity_id=req.identity_id, message=f"Error: {str(e)}")
+    threshold = identity_store.similarity_threshold
+    if req.identity_id not in identity_store:
+        return VerifyResponse(success=False, identity_id=req.identity_id, threshold=threshold,
+                              message=f"Identitas '{req.identity_id}' tidak ditemukan")
+    try:
+        fail_fast = FAIL_FAST_DEFAULT if req.fail_fast is None else req.fail_fast
+        include_timings = TIMING_DETAILS_DEFAULT if req.include_timings is None else req.include_timings
+        result = await executor.verify(req.frames, fail_fast, metrics.enabled or include_timings)
+        metrics.record(result.timings)
+        metrics.record_request('real' if result.is_real else 'fake', time.perf_counter() - start)
+    except ExecutorSaturated as e:
+        metrics.record_request('rejected', time.perf_counter() - start)
+        return JSONResponse(
+            status_code=503,
+            content=VerifyResponse(success=False, identity_id=req.identity_id, message=str(e)).model_dump(),
+            headers={"Retry-After": str(e.retry_after)}
         )
+    except Exception as e:
+        metrics.record_request('error', time.perf_counter() - start)
+        return VerifyResponse(success=False, identity_id=req.identity_id, message=f"Error: {str(e)}")
+    
+    response = VerifyResponse(
+        success=True,
+        identity_id=req.identity_id,
+        threshold=threshold,
+        is_real=result.is_real,
+        confidence=result.confidence,
+        checks=result.checks,
+        details=with_timings(result.details, result, include_timings, start)
+    )
+    embedding = result.embedding
+    if embedding is None or not embedding.success:
+        response.success = False
+        response.message = f"Embedding wajah gagal: {embedding.error_message if embedding else 'tidak ada frame center'}"
+        return response
+    
+    verification = identity_store.verify(req.identity_id, embedding.embedding, result.is_real)
+    response.verified = verification.verified
+    response.similarity = round(float(verification.similarity), 4)
+    if verification.verified:
+        response.message = "Wajah terverifikasi"
+    elif not result.is_real:
+        response.message = "Wajah palsu terdeteksi (foto/video)"
+    else:
+        response.message = "Wajah tidak cocok dengan identitas terdaftar"
+    return response
+
+
+@app.websocket("/ws/liveness/blink")
+async def blink_stream(websocket: WebSocket):
+    """
+    Deteksi kedipan secara streaming, satu frame per pesan.
+    
+    Client mengirim frame sebagai pesan binary (bytes gambar) atau text (base64),
+    lalu text `end` jika frame habis. Server membalas setiap frame dengan
+    {"type": "frame", "ear", "status", "blink_count", ...} dan menutup koneksi
+    dengan {"type": "result", ...} begitu kedipan terdeteksi.
+    """
+    global ws_sessions
+    await websocket.accept()
+    try:
+        await services()
+    except Exception as e:
+        await websocket.send_json({'type': 'error', 'message': f"Error: {str(e)}"})
+        await websocket.close(code=1011)
+        return
+    if ws_sessions is None:
+        ws_sessions = asyncio.Semaphore(WS_MAX_SESSIONS or max(1, liveness_service.pool_size // 2))
+    if ws_sessions.locked():
+        await websocket.send_json({'type': 'error', 'message': 'Server sedang sibuk, coba lagi nanti'})
+        await websocket.close(code=1013)
+        return
+    async with ws_sessions:
+        await run_blink_session(websocket)
+
+
+async def run_blink_session(websocket: WebSocket):
+    try:
+        session = await run_in_threadpool(liveness_service.open_blink_session, WS_ACQUIRE_TIMEOUT)
+    except PoolTimeout:
+        await websocket.send_json({'type': 'error', 'message': 'Server sedang sibuk, coba lagi nanti'})
+        await websocket.close(code=1013)
+        return
+    
+    try:
+        while not session.blinked and session.frames_received < WS_MAX_FRAMES:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), WS_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                # The session holds a pooled detector; an idle client must not keep it.
+                await websocket.send_json({'type': 'error', 'message': 'Tidak ada frame diterima, sesi ditutup'})
+                await websocket.close(code=1008)
+                return
+            if message['type'] == 'websocket.disconnect':
+                return
+            data = message.get('bytes')
+            if data is None:
+                data = message.get('text')
+                if data == 'end':
+                    break
+            try:
+                PAYLOAD_LIMITS.check_frame(f"blink[{session.frames_received}]", data)
+            except PayloadTooLarge as e:
+                await websocket.send_json({'type': 'error', 'message': str(e)})
+                await websocket.close(code=1009)
+                return
+            update = await run_in_threadpool(session.feed, data)
+            await websocket.send_json({'type': 'frame', **update})
+        
+        await websocket.send_json({'type': 'result', **session.result()})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.close()
+
+
+async def read_part(part: Any) -> Any:
+    # Text fields are treated as base64, file parts as raw image bytes.
+    if isinstance(part, str):
+        return part
+    return await part.read()
 
 
 if __name__ == "__main__":
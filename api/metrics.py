@@ -0,0 +1,179 @@
+import bisect
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Upper bounds in seconds; covers a sub-millisecond EAR scan up to a slow multi-frame request.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Timings:
+    """Stage latencies and counters collected during one request.
+
+    Plain lists and dicts so process workers can return it with the result; the main
+    process folds it into the registry. Use NULL_TIMINGS when collection is off. Safe to
+    share between the threads of one request's fan-out.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'samples': self.samples, 'counters': self.counters}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.samples = state['samples']
+        self.counters = state['counters']
+
+    def start(self) -> float:
+        return time.perf_counter()
+
+    def stop(self, stage: str, start: float):
+        self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        return {stage: {'ms': round(sum(values) * 1000, 3), 'calls': len(values)}
+                for stage, values in self.samples.items()}
+
+
+class _NullTimings(Timings):
+    enabled = False
+
+    def start(self) -> float:
+        return 0.0
+
+    def stop(self, stage: str, start: float):
+        pass
+
+    def add(self, stage: str, seconds: float):
+        pass
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+
+NULL_TIMINGS = _NullTimings()
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    """Counters and histograms rendered in the Prometheus text exposition format."""
+
+    STAGE_HELP = ("Per-call latency of each pipeline stage; base64 is part of decode, "
+                  "mesh (full detection), track (tracked sequence frame) and head_pose are parts "
+                  "of detect, align precedes embedding; embed_wait is how long /api/verify still "
+                  "waited for the center-frame embedding after the liveness checks")
+
+    COUNTER_HELP = {
+        'frames_processed': "Frames decoded and run through face detection",
+        'faces_missing': "Frames where no face was found",
+        'multi_face_rejects': "Frames rejected because more than one face was found",
+        'decode_errors': "Frames that could not be decoded",
+        'frames_tracked': "Sequence frames whose landmarks came from tracking instead of a full detection",
+        'tracking_lost': "Tracked frames that failed the overlap check and were detected again",
+        'blink_frames_skipped': "Blink burst frames the adaptive sampler never decoded or ran face mesh on",
+    }
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {name: 0 for name in self.COUNTER_HELP}
+        self._requests: Dict[str, int] = {}
+        self._request_seconds = Histogram()
+
+    @classmethod
+    def from_env(cls) -> "MetricsRegistry":
+        return cls(enabled=os.environ.get("LIVENESS_METRICS", "1") == "1")
+
+    def timings(self, force: bool = False) -> Timings:
+        return Timings() if self.enabled or force else NULL_TIMINGS
+
+    def record(self, timings: Optional[Timings]):
+        if not self.enabled or timings is None or not timings.enabled:
+            return
+        with self._lock:
+            for stage, values in timings.samples.items():
+                histogram = self._stages.get(stage)
+                if histogram is None:
+                    histogram = self._stages[stage] = Histogram()
+                for value in values:
+                    histogram.observe(value)
+            for name, n in timings.counters.items():
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    def record_request(self, result: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._requests[result] = self._requests.get(result, 0) + 1
+            self._request_seconds.observe(seconds)
+
+    def render(self, gauges: Iterable[Tuple[str, str, float]] = ()) -> str:
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, series: List[Tuple[Dict[str, str], Histogram]]):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, h in series:
+                cumulative = 0
+                for bound, n in zip(list(h.buckets) + ['+Inf'], h.counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{_labels({**labels, "le": str(bound)})} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {h.sum:.6f}')
+                lines.append(f'{name}_count{_labels(labels)} {h.count}')
+
+        with self._lock:
+            histogram('liveness_stage_seconds', self.STAGE_HELP,
+                      [({'stage': stage}, h) for stage, h in sorted(self._stages.items())])
+            histogram('liveness_request_seconds', "End-to-end liveness validation latency",
+                      [({}, self._request_seconds)])
+            lines.append('# HELP liveness_requests_total Liveness validations by outcome')
+            lines.append('# TYPE liveness_requests_total counter')
+            for result, n in sorted(self._requests.items()):
+                lines.append(f'liveness_requests_total{_labels({"result": result})} {n}')
+            for name, n in sorted(self._counters.items()):
+                lines.append(f'# HELP liveness_{name}_total {self.COUNTER_HELP.get(name, name)}')
+                lines.append(f'# TYPE liveness_{name}_total counter')
+                lines.append(f'liveness_{name}_total {n}')
+
+        for name, help_text, value in gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry.from_env()
@@ -4,6 +4,8 @@ from typing import Optional, List, Dict, Any
 
 class LivenessRequest(BaseModel):
     frames: Dict[str, Any] = Field(..., description="Frames untuk setiap pose")
+    fail_fast: Optional[bool] = Field(None, description="Hentikan pemrosesan begitu hasil akhir sudah pasti")
+    include_timings: Optional[bool] = Field(None, description="Sertakan rincian waktu per tahap di details.timings")
     
     class Config:
         json_schema_extra = {
@@ -18,6 +20,13 @@ class LivenessRequest(BaseModel):
         }
 
 
+class VerifyRequest(BaseModel):
+    identity_id: str = Field(..., description="ID identitas yang sudah terdaftar di galeri")
+    frames: Dict[str, Any] = Field(..., description="Frames untuk setiap pose, sama seperti LivenessRequest")
+    fail_fast: Optional[bool] = Field(None, description="Hentikan pemrosesan begitu hasil liveness sudah pasti")
+    include_timings: Optional[bool] = Field(None, description="Sertakan rincian waktu per tahap di details.timings")
+
+
 class PoseCheck(BaseModel):
     detected: bool
     expected: str
@@ -34,7 +43,31 @@ class LivenessResponse(BaseModel):
     details: Optional[Dict[str, Any]] = None
 
 
+class VerifyResponse(BaseModel):
+    success: bool
+    verified: bool = False
+    identity_id: str = ""
+    similarity: float = 0.0
+    threshold: float = 0.0
+    is_real: bool = False
+    confidence: float = 0.0
+    checks: Dict[str, Any] = {}
+    message: str = ""
+    details: Optional[Dict[str, Any]] = None
+
+
 class HealthResponse(BaseModel):
     status: str = "ok"
     model_loaded: bool = False
     service: str = "liveness-detection"
+    ready: bool = False
+    executor: Optional[Dict[str, Any]] = None
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool = False
+    import_ms: Optional[float] = None
+    warm_up_ms: Optional[float] = None
+    detectors: int = 0
+    embedding_loaded: bool = False
+    error: Optional[str] = None
@@ -0,0 +1,420 @@
+import binascii
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+_B64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+# base64.b64decode without validate=True drops every other byte, and so do we.
+_B64_DELETE = bytes(c for c in range(256) if c not in _B64_ALPHABET)
+_WHITESPACE = b" \t\r\n"
+_LITERAL = b"0123456789+-.eEtruefalsn"
+_ESCAPES = {ord("/"): b"/", ord("\\"): b"\\", ord('"'): b'"', ord("b"): b"\b", ord("f"): b"\f",
+            ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t"}
+_HEX = b"0123456789abcdefABCDEF"
+_MISSING = object()
+
+
+class PayloadTooLarge(Exception):
+    """Request rejected with 413 before (or instead of) any decoding."""
+
+
+@dataclass
+class PayloadLimits:
+    max_request_bytes: int = 32 * 2 ** 20
+    # Image bytes after base64, and decoded pixels from the image header.
+    max_frame_bytes: int = 4 * 2 ** 20
+    max_frame_pixels: int = 4096 * 4096
+    max_frames: int = 150
+
+    @classmethod
+    def from_env(cls) -> "PayloadLimits":
+        return cls(max_request_bytes=int(os.environ.get("LIVENESS_MAX_REQUEST_BYTES", cls.max_request_bytes)),
+                   max_frame_bytes=int(os.environ.get("LIVENESS_MAX_FRAME_BYTES", cls.max_frame_bytes)),
+                   max_frame_pixels=int(os.environ.get("LIVENESS_MAX_FRAME_PIXELS", cls.max_frame_pixels)),
+                   max_frames=int(os.environ.get("LIVENESS_MAX_FRAMES", cls.max_frames)))
+
+    def check_length(self, content_length: Optional[str]):
+        # Lets a request that announces its size be refused before its body is read.
+        if content_length and content_length.isdigit() and int(content_length) > self.max_request_bytes:
+            raise PayloadTooLarge(f"Ukuran request melebihi batas {self.max_request_bytes} bytes")
+
+    def check_frame(self, name: str, data: Any):
+        if isinstance(data, str):
+            size = len(data) * 3 // 4
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            size = memoryview(data).nbytes
+        else:
+            return
+        if size > self.max_frame_bytes:
+            raise PayloadTooLarge(f"Frame '{name}' melebihi batas {self.max_frame_bytes} bytes")
+        if isinstance(data, str):
+            return
+        # src.image_io brings in cv2; deferred so the API can start serving before it loads.
+        from src.image_io import image_size
+        dims = image_size(data)
+        if dims is not None and dims[0] * dims[1] > self.max_frame_pixels:
+            raise PayloadTooLarge(f"Frame '{name}' berukuran {dims[0]}x{dims[1]}, "
+                                  f"melebihi batas {self.max_frame_pixels} piksel")
+
+    def check_frames(self, frames: Dict[str, Any]):
+        """Per-frame and frame-count limits for an already parsed slot dict (multipart, binary)."""
+        count = 0
+        for slot, value in frames.items():
+            values = value if isinstance(value, list) else [value]
+            for i, data in enumerate(values):
+                count += 1
+                self.check_count(count)
+                self.check_frame(f"{slot}[{i}]" if isinstance(value, list) else slot, data)
+
+    def check_count(self, count: int):
+        if count > self.max_frames:
+            raise PayloadTooLarge(f"Jumlah frame melebihi batas {self.max_frames}")
+
+
+class _Base64Sink:
+    """Decodes one base64 frame string as it arrives, four characters at a time."""
+
+    def __init__(self, name: str, limits: PayloadLimits):
+        self.name = name
+        self._limits = limits
+        self._out = bytearray()
+        self._carry = b""
+        # An escape cut off at the end of the last write_escaped call.
+        self.pending = b""
+        self.valid = True
+
+    def write(self, data: bytes):
+        data = self._carry + data.translate(None, _B64_DELETE)
+        n = len(data) // 4 * 4
+        self._carry = data[n:]
+        if n and self.valid:
+            try:
+                self._out += binascii.a2b_base64(data[:n])
+            except binascii.Error:
+                self.valid = False
+            if len(self._out) > self._limits.max_frame_bytes:
+                raise PayloadTooLarge(f"Frame '{self.name}' melebihi batas {self._limits.max_frame_bytes} bytes")
+
+    def write_escaped(self, data: bytes):
+        """write() for raw JSON string text with backslash escapes in it.
+
+        Escapes decode as json.loads would; malformed ones raise ValueError like it does."""
+        data = self.pending + data
+        self.pending = b""
+        if b"\\\\" in data or b"\\u" in data:
+            self.write(self._unescape(data))
+            return
+        # Every backslash starts a one-character escape: '\/' is how some encoders write
+        # '/', and the other escapes decode to characters base64 drops anyway.
+        if data.endswith(b"\\"):
+            data, self.pending = data[:-1], b"\\"
+        data = data.replace(b"\\/", b"/")
+        for escape in (b'\\"', b"\\b", b"\\f", b"\\n", b"\\r", b"\\t"):
+            data = data.replace(escape, b"")
+        if b"\\" in data:
+            raise ValueError("Invalid \\escape in frame string")
+        self.write(data)
+
+    def _unescape(self, data: bytes) -> bytes:
+        out = bytearray()
+        pos, n = 0, len(data)
+        while True:
+            backslash = data.find(b"\\", pos)
+            if backslash == -1:
+                out += data[pos:]
+                return bytes(out)
+            out += data[pos:backslash]
+            if backslash + 1 == n or (data[backslash + 1] == ord("u") and backslash + 6 > n):
+                self.pending = data[backslash:]
+                return bytes(out)
+            char = data[backslash + 1]
+            if char == ord("u"):
+                digits = data[backslash + 2:backslash + 6]
+                if digits.translate(None, _HEX):
+                    raise ValueError("Invalid \\uXXXX escape in frame string")
+                code = int(digits, 16)
+                if code < 0x80:
+                    out.append(code)
+                else:
+                    # json.loads accepts it, but base64.b64decode rejects non-ASCII text.
+                    self.valid = False
+                pos = backslash + 6
+            elif char in _ESCAPES:
+                out += _ESCAPES[char]
+                pos = backslash + 2
+            else:
+                raise ValueError("Invalid \\escape in frame string")
+
+    def close(self) -> bytes:
+        if self.pending:
+            raise ValueError("Invalid \\uXXXX escape in frame string")
+        # Bad padding or characters fail decode_image later, as base64.b64decode errors did.
+        if self._carry or not self.valid:
+            return b""
+        return bytes(self._out)
+
+
+class JsonFrameParser:
+    """Incremental JSON parser that base64-decodes frame strings while the body streams in.
+
+    Feed it the request body in chunks; strings under `frames` (a slot's value, or an
+    element of a slot's list) become image bytes as they arrive, so neither the body nor
+    the base64 text is ever held whole. Everything else parses as ordinary JSON.
+    """
+
+    def __init__(self, limits: PayloadLimits):
+        self.limits = limits
+        self.received = 0
+        self.frame_count = 0
+        # [container, path, pending object key]
+        self._stack: List[List[Any]] = []
+        self._state = "value"
+        self._root: Any = _MISSING
+        self._buf = bytearray()
+        self._sink: Optional[_Base64Sink] = None
+        self._is_key = False
+        self._escape = False
+
+    def feed(self, chunk: bytes):
+        self.received += len(chunk)
+        if self.received > self.limits.max_request_bytes:
+            raise PayloadTooLarge(f"Ukuran request melebihi batas {self.limits.max_request_bytes} bytes")
+        pos, n = 0, len(chunk)
+        while pos < n:
+            state = self._state
+            if state == "string":
+                pos = self._scan_string(chunk, pos)
+                continue
+            c = chunk[pos]
+            if state == "literal":
+                if c in _LITERAL:
+                    self._buf.append(c)
+                    pos += 1
+                    continue
+                self._end_literal()
+                continue
+            pos += 1
+            if c in _WHITESPACE:
+                continue
+            if state == "value":
+                self._start_value(c)
+            elif state == "value_or_end":
+                if c == ord("]"):
+                    self._pop()
+                else:
+                    self._start_value(c)
+            elif state in ("key_or_end", "key"):
+                if c == ord('"'):
+                    self._start_string(key=True)
+                elif c == ord("}") and state == "key_or_end":
+                    self._pop()
+                else:
+                    raise ValueError("Expected an object key")
+            elif state == "colon":
+                if c != ord(":"):
+                    raise ValueError("Expected ':'")
+                self._state = "value"
+            elif state == "comma_or_end":
+                container = self._stack[-1][0] if self._stack else None
+                if c == ord(","):
+                    self._state = "key" if isinstance(container, dict) else "value"
+                elif (c == ord("}") and isinstance(container, dict)) or (c == ord("]") and isinstance(container, list)):
+                    self._pop()
+                else:
+                    raise ValueError(f"Unexpected character '{chr(c)}'")
+            else:
+                raise ValueError("Extra data after the JSON document")
+
+    def close(self) -> Any:
+        if self._state == "literal":
+            self._end_literal()
+        if self._root is _MISSING or self._stack or self._state != "end":
+            raise ValueError("Incomplete JSON document")
+        return self._root
+
+    def _path(self) -> Tuple[Any, ...]:
+        if not self._stack:
+            return ()
+        container, path, key = self._stack[-1]
+        return path + ((key,) if isinstance(container, dict) else (len(container),))
+
+    @staticmethod
+    def _is_frame(path: Tuple[Any, ...]) -> bool:
+        return (len(path) == 2 or (len(path) == 3 and isinstance(path[2], int))) and path[0] == "frames"
+
+    def _start_value(self, c: int):
+        if c == ord("{"):
+            self._stack.append([{}, self._path(), None])
+            self._state = "key_or_end"
+        elif c == ord("["):
+            self._stack.append([[], self._path(), None])
+            self._state = "value_or_end"
+        elif c == ord('"'):
+            self._start_string(key=False)
+        elif c in _LITERAL:
+            self._buf = bytearray([c])
+            self._state = "literal"
+        else:
+            raise ValueError(f"Unexpected character '{chr(c)}'")
+
+    def _start_string(self, key: bool):
+        self._is_key = key
+        self._buf = bytearray()
+        self._sink = None
+        if not key:
+            path = self._path()
+            if self._is_frame(path):
+                name = path[1] if len(path) == 2 else f"{path[1]}[{path[2]}]"
+                self._sink = _Base64Sink(name, self.limits)
+        self._state = "string"
+
+    def _scan_string(self, chunk: bytes, pos: int) -> int:
+        if self._sink is not None:
+            return self._scan_frame(chunk, pos)
+        n = len(chunk)
+        if self._escape:
+            self._escape = False
+            self._escaped(chunk[pos])
+            pos += 1
+        quote = chunk.find(b'"', pos)
+        backslash = chunk.find(b"\\", pos)
+        while True:
+            if backslash != -1 and (quote == -1 or backslash < quote):
+                self._write(chunk[pos:backslash])
+                if backslash + 1 == n:
+                    self._escape = True
+                    return n
+                self._escaped(chunk[backslash + 1])
+                pos = backslash + 2
+                backslash = chunk.find(b"\\", pos)
+                if quote != -1 and quote < pos:
+                    quote = chunk.find(b'"', pos)
+                continue
+            if quote == -1:
+                self._write(chunk[pos:])
+                return n
+            self._write(chunk[pos:quote])
+            self._end_string()
+            return quote + 1
+
+    def _scan_frame(self, chunk: bytes, pos: int) -> int:
+        # Frame strings are long and may escape every '/', so they are handled a run at a time.
+        # A backslash left pending by the previous chunk escapes this chunk's first character.
+        n = len(chunk)
+        start = pos + 1 if self._sink.pending == b"\\" else pos
+        quote = chunk.find(b'"', start)
+        while quote != -1 and _backslashes_before(chunk, start, quote) % 2:
+            quote = chunk.find(b'"', quote + 1)
+        end = n if quote == -1 else quote
+        data = chunk[pos:end]
+        if self._sink.pending or b"\\" in data:
+            self._sink.write_escaped(data)
+        else:
+            self._sink.write(data)
+        if quote == -1:
+            return n
+        self._end_string()
+        return quote + 1
+
+    def _write(self, data: bytes):
+        if self._sink is not None:
+            self._sink.write(data)
+        else:
+            self._buf += data
+
+    def _escaped(self, char: int):
+        self._buf += b"\\" + bytes([char])
+
+    def _end_string(self):
+        if self._sink is not None:
+            value = self._sink.close()
+            name = self._sink.name
+            self._sink = None
+            self.frame_count += 1
+            self.limits.check_count(self.frame_count)
+            self.limits.check_frame(name, value)
+            self._emit(value)
+            return
+        value = json.loads(b'"' + bytes(self._buf) + b'"')
+        if self._is_key:
+            self._stack[-1][2] = value
+            self._state = "colon"
+        else:
+            self._emit(value)
+
+    def _end_literal(self):
+        self._emit(json.loads(bytes(self._buf)))
+
+    def _pop(self):
+        container = self._stack.pop()[0]
+        self._emit(container)
+
+    def _emit(self, value: Any):
+        if not self._stack:
+            self._root = value
+            self._state = "end"
+            return
+        container, _, key = self._stack[-1]
+        if isinstance(container, dict):
+            container[key] = value
+        else:
+            container.append(value)
+        self._state = "comma_or_end"
+
+
+def _backslashes_before(chunk: bytes, start: int, end: int) -> int:
+    count = 0
+    while end - count > start and chunk[end - count - 1] == 0x5C:
+        count += 1
+    return count
+
+
+async def read_json(request: Any, limits: PayloadLimits) -> Any:
+    """Parse a JSON request body chunk by chunk; frame strings arrive as image bytes."""
+    limits.check_length(request.headers.get("content-length"))
+    parser = JsonFrameParser(limits)
+    async for chunk in request.stream():
+        if chunk:
+            parser.feed(chunk)
+    return parser.close()
+
+
+async def read_body(request: Any, limits: PayloadLimits) -> bytes:
+    limits.check_length(request.headers.get("content-length"))
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limits.max_request_bytes:
+            raise PayloadTooLarge(f"Ukuran request melebihi batas {limits.max_request_bytes} bytes")
+    return bytes(body)
+
+
+async def read_form(request: Any, limits: PayloadLimits) -> Any:
+    """request.form() with the body size counted as it streams and the part count bounded.
+
+    File parts are spooled without a size limit of their own, so the byte count is the only
+    bound on them until check_frames sees the parsed frames."""
+    limits.check_length(request.headers.get("content-length"))
+    receive = request.receive
+    received = 0
+
+    async def counted_receive():
+        nonlocal received
+        message = await receive()
+        received += len(message.get("body", b""))
+        if received > limits.max_request_bytes:
+            raise PayloadTooLarge(f"Ukuran request melebihi batas {limits.max_request_bytes} bytes")
+        return message
+
+    from starlette.exceptions import HTTPException
+    try:
+        # Text fields hold base64, a third larger than the frame it encodes.
+        return await type(request)(request.scope, counted_receive).form(
+            max_files=limits.max_frames, max_fields=limits.max_frames,
+            max_part_size=limits.max_frame_bytes * 4 // 3 + 4)
+    except HTTPException as e:
+        # Starlette reports its part count and field size limits as 400s; they are ours.
+        if "Too many" in e.detail or "exceeded maximum size" in e.detail:
+            raise PayloadTooLarge(e.detail)
+        raise
@@ -0,0 +1,31 @@
+import os
+
+from src.embedding import EmbeddingBatcher, FaceEmbedding, IdentityStore, SessionConfig
+
+
+def create_face_embedding() -> FaceEmbedding:
+    return FaceEmbedding(model_path=os.environ.get("EMBEDDING_MODEL", "buffalo_sc/w600k_mbf.onnx"),
+                         optimized_model_path=os.environ.get("EMBEDDING_OPTIMIZED_MODEL") or None,
+                         session_config=SessionConfig.from_env())
+
+
+def create_batcher(embedder: FaceEmbedding) -> EmbeddingBatcher:
+    # Concurrent /api/verify requests share one inference call per batch window.
+    return EmbeddingBatcher(embedder,
+                            max_batch=int(os.environ.get("EMBEDDING_MAX_BATCH", 16)),
+                            max_wait_ms=float(os.environ.get("EMBEDDING_MAX_WAIT_MS", 2.0)))
+
+
+def load_identity_store() -> IdentityStore:
+    """Gallery from IDENTITY_GALLERY (see `python -m src.gallery convert`), empty if unset."""
+    threshold = float(os.environ.get("IDENTITY_THRESHOLD", 0.35))
+    path = os.environ.get("IDENTITY_GALLERY")
+    if path:
+        store = IdentityStore.load(path, threshold)
+        print(f"Identity gallery loaded: {len(store)} identities from {path}")
+        return store
+    return IdentityStore(threshold)
+
+
+face_embedding = create_face_embedding()
+embedding_batcher = create_batcher(face_embedding)
@@ -0,0 +1,97 @@
+"""Recall@k and latency of IVFIndex against the exact FlatIndex scan.
+
+Synthetic ArcFace-like gallery: identity centres drawn around a few hundred
+cluster means on the 512-d unit sphere, enrolled and query vectors are
+independent noisy samples of each centre (genuine cosine around 0.6).
+
+    python -m benchmarks.ann_recall --gallery 200000 --nlist 1024 --nprobe 8 16 32 64
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.vector_index import FlatIndex, IVFIndex, normalise
+
+
+def synthetic_gallery(n: int, dim: int, clusters: int, noise: float, seed: int):
+    rng = np.random.default_rng(seed)
+    means = normalise(rng.standard_normal((clusters, dim)))
+    centres = normalise(means[rng.integers(0, clusters, n)] + 0.08 * rng.standard_normal((n, dim)))
+    enrolled = normalise(centres + noise * rng.standard_normal((n, dim)))
+    return rng, centres, enrolled
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gallery", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--noise", type=float, default=0.036, help="per-dimension noise std of each sample")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32, 64])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this path")
+    args = parser.parse_args()
+
+    rng, centres, enrolled = synthetic_gallery(args.gallery, args.dim, args.clusters, args.noise, args.seed)
+    query_ids = rng.choice(args.gallery, size=args.queries, replace=False)
+    queries = normalise(centres[query_ids] + args.noise * rng.standard_normal((args.queries, args.dim)))
+
+    flat = FlatIndex(dim=args.dim, initial_capacity=args.gallery)
+    ivf = IVFIndex(nlist=args.nlist, min_train_size=args.gallery + 1)
+    start = time.perf_counter()
+    for i, vector in enumerate(enrolled):
+        flat.add(str(i), vector)
+    flat_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i, vector in enumerate(enrolled):
+        ivf.add(str(i), vector)
+    ivf.train()
+    ivf_build = time.perf_counter() - start
+
+    exact, exact_times = [], []
+    for q in queries:
+        t = time.perf_counter()
+        keys, _ = flat.search(q, args.k)
+        exact_times.append(time.perf_counter() - t)
+        exact.append(keys)
+
+    report = {
+        "gallery": args.gallery, "dim": args.dim, "k": args.k, "nlist": args.nlist, "queries": args.queries,
+        "build_s": {"flat": round(flat_build, 3), "ivf": round(ivf_build, 3)},
+        "exact": {"p50_ms": percentile_ms(exact_times, 50), "p95_ms": percentile_ms(exact_times, 95),
+                  "top1_is_genuine": float(np.mean([keys[0] == str(i) for keys, i in zip(exact, query_ids)]))},
+        "ivf": []
+    }
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        hits, times = 0, []
+        for q, truth in zip(queries, exact):
+            t = time.perf_counter()
+            keys, _ = ivf.search(q, args.k)
+            times.append(time.perf_counter() - t)
+            hits += len(set(keys) & set(truth))
+        report["ivf"].append({
+            "nprobe": nprobe,
+            f"recall@{args.k}": round(hits / (len(queries) * args.k), 4),
+            "p50_ms": percentile_ms(times, 50),
+            "p95_ms": percentile_ms(times, 95)
+        })
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
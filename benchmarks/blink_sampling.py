@@ -0,0 +1,134 @@
+"""Face mesh calls saved by adaptive blink sampling, and whether any blink decision changes.
+
+For each --strides value every burst is run twice, densely (stride 1) and sampled, and the
+report gives the share of frames the sampler looked at and the bursts whose valid flag or
+blink_count differ from the dense run.
+
+  synthetic  --bursts seeded eye landmark sequences, --frames long: open eyes with EAR
+             noise, zero to three blinks with 1-2 frame closing/opening ramps and a 1-6
+             frame closed run, plus occasional frames without a face. No face mesh involved,
+             so this measures the sampler alone and is fast enough for thousands of bursts.
+  recorded   LivenessRequest .json/.jsonl files or directories (--payloads, as for
+             benchmarks.load); each 'blink' burst goes through LivenessService.validate_blink
+             with LIVENESS_BLINK_STRIDE-equivalent settings, timed end to end.
+
+    python -m benchmarks.blink_sampling --strides 2 3 4 --json sampling.json
+    python -m benchmarks.blink_sampling --payloads recorded/ --strides 2 3
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.ann_recall import percentile_ms
+from benchmarks.load import load_payloads
+from benchmarks.pipeline import environment
+from src.blink_detector import BlinkDetector, BlinkSampler
+
+# Open-eye outline with EAR 0.3; scaling y scales the EAR linearly.
+OPEN_EYE = np.array([[0, 0], [10, -4.5], [20, -4.5], [30, 0], [20, 4.5], [10, 4.5]], dtype=np.float64)
+
+
+def synthetic_burst(rng, frames):
+    ear = rng.normal(rng.uniform(0.27, 0.34), 0.01, frames)
+    for _ in range(rng.integers(0, 4)):
+        closing, closed, opening = rng.integers(1, 3), rng.integers(1, 7), rng.integers(1, 3)
+        start = rng.integers(0, frames)
+        profile = np.concatenate([np.linspace(0.26, 0.2, closing), rng.uniform(0.05, 0.19, closed),
+                                  np.linspace(0.2, 0.26, opening)])
+        end = min(frames, start + len(profile))
+        ear[start:end] = profile[:end - start]
+    eyes = []
+    for value in ear:
+        if rng.random() < 0.03:
+            eyes.append(None)
+            continue
+        eye = OPEN_EYE * [1, value / 0.3]
+        eyes.append((eye, eye + 60))
+    return eyes
+
+
+def run_synthetic(args):
+    rng = np.random.default_rng(args.seed)
+    bursts = [synthetic_burst(rng, args.frames) for _ in range(args.bursts)]
+    dense = []
+    for eyes in bursts:
+        detector = BlinkDetector()
+        for pair in eyes:
+            if pair is not None:
+                detector.detect(*pair)
+        dense.append(detector.blink_count)
+
+    results = []
+    for stride in args.strides:
+        looked, count_diff, decision_diff = 0, 0, 0
+        for eyes, expected in zip(bursts, dense):
+            sampler = BlinkSampler(BlinkDetector(), stride)
+            count = sampler.run(len(eyes), eyes.__getitem__)
+            looked += sampler.frames_looked
+            count_diff += count != expected
+            decision_diff += (count >= 1) != (expected >= 1)
+        results.append({"stride": stride, "bursts": len(bursts),
+                        "bursts_with_blink": sum(1 for c in dense if c >= 1),
+                        "frames_looked_ratio": round(looked / (len(bursts) * args.frames), 4),
+                        "decision_mismatches": decision_diff, "count_mismatches": count_diff})
+    return results
+
+
+def run_recorded(args):
+    from api.liveness_service import LivenessService
+
+    bursts = [json.loads(body)["frames"].get("blink") for body in load_payloads(args.payloads, None, 0, False)]
+    bursts = [b if isinstance(b, list) else [b] for b in bursts if b]
+    if not bursts:
+        raise SystemExit("No blink bursts in --payloads")
+
+    def run(stride):
+        service = LivenessService(frame_cache_size=0, pool_size=1, blink_stride=stride)
+        service.warm_up()
+        outputs, latencies = [], []
+        for burst in bursts:
+            start = time.perf_counter()
+            outputs.append(service.validate_blink(burst))
+            latencies.append(time.perf_counter() - start)
+        return outputs, latencies
+
+    dense, dense_latency = run(1)
+    results = [{"stride": 1, "bursts": len(bursts), "frames": sum(len(b) for b in bursts),
+                "p50_ms": percentile_ms(dense_latency, 50), "p95_ms": percentile_ms(dense_latency, 95)}]
+    for stride in args.strides:
+        outputs, latencies = run(stride)
+        skipped = sum(o.get("frames_skipped", 0) for o in outputs)
+        results.append({
+            "stride": stride, "bursts": len(bursts),
+            "frames_looked_ratio": round(1 - skipped / results[0]["frames"], 4),
+            "decision_mismatches": sum(o["valid"] != d["valid"] for o, d in zip(outputs, dense)),
+            "count_mismatches": sum(o["blink_count"] != d["blink_count"] for o, d in zip(outputs, dense)),
+            "p50_ms": percentile_ms(latencies, 50), "p95_ms": percentile_ms(latencies, 95)
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", nargs="*", default=[], help="recorded LivenessRequest files; synthetic if omitted")
+    parser.add_argument("--strides", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--bursts", type=int, default=2000, help="synthetic bursts")
+    parser.add_argument("--frames", type=int, default=60, help="frames per synthetic burst")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this path")
+    args = parser.parse_args()
+
+    mode = "recorded" if args.payloads else "synthetic"
+    runs = run_recorded(args) if args.payloads else run_synthetic(args)
+    report = {"environment": environment(), "mode": mode,
+              "config": {k: v for k, v in vars(args).items() if k != "json"}, "runs": runs}
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
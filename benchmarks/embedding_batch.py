@@ -0,0 +1,75 @@
+"""Per-face latency of FaceEmbedding: one call per face vs generate_embeddings vs EmbeddingBatcher.
+
+Landmarks come from FaceDetector on --image; the same face is embedded --faces times.
+The batcher run submits every face from its own thread, as concurrent requests would.
+
+    python -m benchmarks.embedding_batch --image face.jpg --faces 8 --model buffalo_sc/w600k_mbf.onnx
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from src.embedding import EmbeddingBatcher, FaceEmbedding
+from src.face_detector import FaceDetector
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True)
+    parser.add_argument("--model", default="buffalo_sc/w600k_mbf.onnx")
+    parser.add_argument("--faces", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--json", help="write results to this path")
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image)
+    face = FaceDetector().detect(frame)
+    if not face.detected:
+        raise SystemExit(f"No face found in {args.image}")
+    embedder = FaceEmbedding(args.model)
+    if not embedder.generate_embedding(frame, face.landmarks).success:
+        raise SystemExit(f"Could not load {args.model}")
+
+    frames = [frame] * args.faces
+    landmarks = [face.landmarks] * args.faces
+    batcher = EmbeddingBatcher(embedder, max_batch=args.faces, max_wait_ms=args.max_wait_ms)
+    pool = ThreadPoolExecutor(max_workers=args.faces)
+
+    def concurrent():
+        futures = [pool.submit(batcher.generate_embedding, frame, face.landmarks) for _ in range(args.faces)]
+        return [f.result() for f in futures]
+
+    per_face = {
+        "sequential": timed(lambda: [embedder.generate_embedding(f, l) for f, l in zip(frames, landmarks)], args.repeat),
+        "batched": timed(lambda: embedder.generate_embeddings(frames, landmarks), args.repeat),
+        "batcher": timed(concurrent, args.repeat),
+    }
+    report = {
+        "faces": args.faces,
+        "dynamic_batch": embedder._dynamic_batch,
+        "per_face_ms": {name: round(t / args.faces * 1000, 3) for name, t in per_face.items()},
+        "batcher": batcher.stats()
+    }
+    batcher.close()
+    pool.shutdown()
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
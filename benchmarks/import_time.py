@@ -0,0 +1,152 @@
+"""Cold import time of the API (python -X importtime) and time until /health answers, with budgets.
+
+Each --repeat run imports --module in a fresh interpreter; the report gives the median total,
+the packages with the most import time of their own, and whether any --forbid module (the
+inference stack, which should only load after the server is up) was imported. With --serve,
+uvicorn is started --repeat times and the time from process start to the first 200 from
+/health (and /ready) is measured as well.
+
+The exit code is 1 when the median import exceeds --budget-ms, /health exceeds
+--health-budget-ms, or a forbidden module is imported, so this can gate CI:
+
+    python -m benchmarks.import_time --budget-ms 600 --forbid mediapipe cv2 onnxruntime
+    python -m benchmarks.import_time --serve --health-budget-ms 1500 --json startup.json
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from benchmarks.pipeline import environment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module):
+    """[(name, depth, self_us, cumulative_us)] for one fresh `import module`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, len(indent) // 2, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_serve(module, timeout):
+    """Seconds from starting uvicorn to the first 200 from /health and from /ready."""
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=ROOT, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+    times = {}
+    try:
+        while len(times) < 2 and time.perf_counter() - start < timeout:
+            for path in ("/health", "/ready"):
+                if path in times:
+                    continue
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                        if response.status == 200:
+                            times[path] = time.perf_counter() - start
+                except (urllib.error.URLError, ConnectionError, TimeoutError):
+                    pass
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return times.get("/health"), times.get("/ready")
+
+
+def summarise(profiles, top):
+    totals = [max(e[3] for e in entries) / 1000 for entries in profiles]
+    # Self time summed per top-level package, so nested imports are counted once and
+    # attributed to the package that owns them rather than whichever module imported first.
+    packages = {}
+    for entries in profiles:
+        run = {}
+        for name, _, self_us, _ in entries:
+            package = name.split(".")[0]
+            run[package] = run.get(package, 0) + self_us / 1000
+        for package, ms in run.items():
+            packages.setdefault(package, []).append(ms)
+    heaviest = sorted(((name, float(np.median(v))) for name, v in packages.items()), key=lambda x: -x[1])
+    return {
+        "median_ms": round(float(np.median(totals)), 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "modules_imported": len(profiles[-1]),
+        "top_packages": [{"package": name, "self_ms": round(ms, 1)} for name, ms in heaviest[:top]]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="api.main", help="module to import (and serve with --serve)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest packages to list")
+    parser.add_argument("--forbid", nargs="*", default=["mediapipe", "cv2", "onnxruntime", "matplotlib"],
+                        help="modules that must not be imported by --module")
+    parser.add_argument("--budget-ms", type=float, help="fail if the median import takes longer")
+    parser.add_argument("--serve", action="store_true", help="also time uvicorn start -> /health and /ready")
+    parser.add_argument("--health-budget-ms", type=float, help="fail if /health takes longer (median, --serve)")
+    parser.add_argument("--serve-timeout", type=float, default=120.0)
+    parser.add_argument("--json", help="write results to this path")
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.repeat)]
+    report = {"environment": environment(), "module": args.module, "import": summarise(profiles, args.top)}
+    imported = {name for entries in profiles for name, _, _, _ in entries}
+    report["forbidden_imported"] = sorted(name for name in args.forbid if name in imported)
+
+    failures = []
+    if args.budget_ms is not None and report["import"]["median_ms"] > args.budget_ms:
+        failures.append(f"import {args.module}: {report['import']['median_ms']} ms > budget {args.budget_ms} ms")
+    if report["forbidden_imported"]:
+        failures.append(f"import {args.module} loads {', '.join(report['forbidden_imported'])}")
+
+    if args.serve:
+        runs = [time_to_serve(args.module, args.serve_timeout) for _ in range(args.repeat)]
+        health = [h * 1000 for h, _ in runs if h is not None]
+        ready = [r * 1000 for _, r in runs if r is not None]
+        report["serve"] = {
+            "health_ms": round(float(np.median(health)), 1) if health else None,
+            "ready_ms": round(float(np.median(ready)), 1) if ready else None,
+            "failed_starts": sum(1 for h, _ in runs if h is None)
+        }
+        if not health:
+            failures.append(f"/health did not answer within {args.serve_timeout}s")
+        elif args.health_budget_ms is not None and report["serve"]["health_ms"] > args.health_budget_ms:
+            failures.append(f"/health after {report['serve']['health_ms']} ms > budget {args.health_budget_ms} ms")
+
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
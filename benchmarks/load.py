@@ -0,0 +1,217 @@
+"""Open-loop load test of POST /api/liveness/validate with recorded LivenessRequest payloads.
+
+Requests are sent at a fixed --rates step (requests/s, evenly spaced) for --duration
+seconds each, with at most --concurrency in flight; a request that finds every slot
+busy waits client-side, as it would in front of a Cloud Run instance with that
+concurrency. Per step it reports:
+
+  queue_ms    scheduled send time -> slot acquired (client-side backlog)
+  latency_ms  sent -> response received
+  server_ms   details.timings.total_ms from the API (executor queue + work)
+  error_rate  responses other than 200 or transport failures; 503s are also counted
+              separately as rejected (executor queue full)
+
+The saturation point is the first rate whose achieved throughput falls below
+--min-ratio of the offered rate, whose p95 total (queue + latency) exceeds --slo-ms, or
+whose error rate exceeds --max-error-rate; the step before it is the sustainable rate.
+
+Without --url the app runs in-process through httpx's ASGI transport (lifespan and
+warm-up included; the client shares the process, so leave a core for it). With --url
+it drives a running server, e.g. `uvicorn api.main:app --workers 2`. Needs httpx.
+
+    python -m benchmarks.load --payloads recorded/ --rates 2 4 8 16 --concurrency 8
+    python -m benchmarks.load --image face.jpg --url http://localhost:8000 --json load.json
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+
+import cv2
+import httpx
+import numpy as np
+
+from benchmarks.ann_recall import percentile_ms
+from benchmarks.pipeline import encode_frames, environment
+
+ENDPOINT = "/api/liveness/validate"
+
+
+def load_payloads(paths, image, blink_frames, include_timings):
+    """LivenessRequest bodies from .json files, .jsonl files (one per line) or directories of them."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.json")) + glob.glob(os.path.join(path, "*.jsonl")))
+        else:
+            files.append(path)
+    payloads = []
+    for path in files:
+        with open(path) as f:
+            if path.endswith(".jsonl"):
+                payloads += [json.loads(line) for line in f if line.strip()]
+            else:
+                payloads.append(json.load(f))
+    if image:
+        frame = cv2.imread(image)
+        if frame is None:
+            raise SystemExit(f"Could not read {image}")
+        poses = encode_frames(frame, 3)
+        payloads.append({"frames": {"right": poses[0], "left": poses[1], "center": poses[2],
+                                    "blink": encode_frames(frame, blink_frames)}})
+    if not payloads:
+        raise SystemExit("No payloads: pass --payloads and/or --image")
+    if include_timings:
+        payloads = [{**p, "include_timings": True} for p in payloads]
+    return [json.dumps(p).encode() for p in payloads]
+
+
+async def wait_ready(client, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit(f"/ready did not return 200 within {timeout}s")
+
+
+async def run_step(client, payloads, rate, concurrency, duration, include_timings):
+    slots = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(body, scheduled):
+        async with slots:
+            sent = time.perf_counter()
+            status, server_ms = None, None
+            try:
+                response = await client.post(ENDPOINT, content=body, headers={"Content-Type": "application/json"})
+                status = response.status_code
+                if status == 200 and include_timings:
+                    server_ms = ((response.json().get("details") or {}).get("timings") or {}).get("total_ms")
+            except httpx.HTTPError:
+                pass
+            samples.append((sent - scheduled, time.perf_counter() - sent, status, server_ms))
+
+    count = max(1, int(rate * duration))
+    start = time.perf_counter()
+    tasks = []
+    for i in range(count):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(payloads[i % len(payloads)], scheduled)))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+
+    queue = [s[0] for s in samples]
+    latency = [s[1] for s in samples]
+    total = [s[0] + s[1] for s in samples]
+    server = [s[3] / 1000 for s in samples if s[3] is not None]
+    statuses = {}
+    for s in samples:
+        key = str(s[2]) if s[2] is not None else "transport_error"
+        statuses[key] = statuses.get(key, 0) + 1
+    errors = len(samples) - statuses.get("200", 0)
+    return {
+        "offered_per_s": rate, "concurrency": concurrency, "requests": len(samples),
+        # The last request is scheduled at (count - 1) / rate, so never divide by less than the step.
+        "achieved_per_s": round(len(samples) / max(wall, duration), 2),
+        "queue_ms": {"p50": percentile_ms(queue, 50), "p95": percentile_ms(queue, 95), "p99": percentile_ms(queue, 99)},
+        "latency_ms": {"p50": percentile_ms(latency, 50), "p95": percentile_ms(latency, 95),
+                       "p99": percentile_ms(latency, 99)},
+        "total_ms": {"p50": percentile_ms(total, 50), "p95": percentile_ms(total, 95), "p99": percentile_ms(total, 99)},
+        "server_ms": {"p50": percentile_ms(server, 50), "p95": percentile_ms(server, 95)} if server else None,
+        "error_rate": round(errors / len(samples), 4),
+        "rejected": statuses.get("503", 0),
+        "status": statuses
+    }
+
+
+def saturation(steps, min_ratio, slo_ms, max_error_rate):
+    sustainable, saturated = None, None
+    for step in steps:
+        if (step["achieved_per_s"] < min_ratio * step["offered_per_s"] or step["total_ms"]["p95"] > slo_ms
+                or step["error_rate"] > max_error_rate):
+            saturated = step["offered_per_s"]
+            break
+        sustainable = step["offered_per_s"]
+    return {"sustainable_per_s": sustainable, "saturated_at_per_s": saturated,
+            "peak_achieved_per_s": max(s["achieved_per_s"] for s in steps)}
+
+
+async def run(args, payloads):
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits)
+        lifespan = None
+    else:
+        from api.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app", timeout=timeout)
+        # ASGITransport does not send lifespan events, so enter the app's lifespan here.
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+
+    report = {"environment": environment(), "target": args.url or "in-process", "payloads": len(payloads),
+              "config": {k: v for k, v in vars(args).items() if k not in ("json", "payloads")}, "runs": []}
+    try:
+        await wait_ready(client, args.ready_timeout)
+        for body in payloads[:args.warmup]:
+            await client.post(ENDPOINT, content=body, headers={"Content-Type": "application/json"})
+        for concurrency in args.concurrency:
+            steps = []
+            for rate in args.rates:
+                step = await run_step(client, payloads, rate, concurrency, args.duration, args.include_timings)
+                steps.append(step)
+                print(json.dumps(step))
+                if args.stop_at_saturation and saturation(steps, args.min_ratio, args.slo_ms,
+                                                          args.max_error_rate)["saturated_at_per_s"] is not None:
+                    break
+            report["runs"].append({"concurrency": concurrency, "steps": steps,
+                                   **saturation(steps, args.min_ratio, args.slo_ms, args.max_error_rate)})
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", nargs="*", default=[], help=".json/.jsonl LivenessRequest files or directories")
+    parser.add_argument("--image", help="also replay a request built from this face photo")
+    parser.add_argument("--blink-frames", type=int, default=10, help="blink frames in the --image request")
+    parser.add_argument("--url", help="base URL of a running server; in-process ASGI if omitted")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 4, 8], help="offered requests/s per step")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8], help="max requests in flight")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per step")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed requests before the first step")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--include-timings", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="p95 queue + latency budget")
+    parser.add_argument("--min-ratio", type=float, default=0.95, help="achieved / offered below this = saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--stop-at-saturation", action="store_true")
+    parser.add_argument("--seed", type=int, default=0, help="payload order shuffle")
+    parser.add_argument("--json", help="write results to this path")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads, args.image, args.blink_frames, args.include_timings)
+    np.random.default_rng(args.seed).shuffle(payloads)
+    report = asyncio.run(run(args, payloads))
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
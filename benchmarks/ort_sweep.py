@@ -0,0 +1,71 @@
+"""Embedding throughput across worker-process x intra-op-thread combinations.
+
+Each worker process owns one FaceEmbedding session (configured like the API via
+SessionConfig) and runs batches of random aligned crops for --seconds. Total
+faces/s across workers shows which split of the box's cores works best.
+
+    python -m benchmarks.ort_sweep --workers 1 2 4 --threads 1 2 4 --batch 1 8 --io-binding
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from src.embedding import FaceEmbedding, SessionConfig
+
+
+def run_worker(model: str, config: SessionConfig, batch: int, seconds: float, start_at: float) -> int:
+    embedder = FaceEmbedding(model, session_config=config)
+    if not embedder.warm_up():
+        raise RuntimeError(f"Could not load {model}")
+    crops = np.random.default_rng(os.getpid()).uniform(-1, 1, (batch, 3, 112, 112)).astype(np.float32)
+    time.sleep(max(0.0, start_at - time.time()))
+    faces = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        embedder._infer(crops)
+        faces += batch
+    return faces
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="buffalo_sc/w600k_mbf.onnx")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1])
+    parser.add_argument("--execution-mode", default="sequential", choices=["sequential", "parallel"])
+    parser.add_argument("--io-binding", action="store_true")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--json", help="write results to this path")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    report = {"cpus": os.cpu_count(), "model": args.model, "seconds": args.seconds, "runs": []}
+    for workers, threads, batch in itertools.product(args.workers, args.threads, args.batch):
+        config = SessionConfig(intra_op_threads=threads, inter_op_threads=1,
+                               execution_mode=args.execution_mode, io_binding=args.io_binding)
+        # Workers load their sessions first, then start the timed loop together.
+        start_at = time.time() + 2.0
+        with ctx.Pool(workers) as pool:
+            faces = pool.starmap(run_worker, [(args.model, config, batch, args.seconds, start_at)] * workers)
+        total = sum(faces)
+        report["runs"].append({
+            "workers": workers, "intra_op_threads": threads, "batch": batch,
+            "faces_per_s": round(total / args.seconds, 1),
+            "worker_ms_per_face": round(args.seconds * workers * 1000 / total, 3) if total else None
+        })
+        print(json.dumps(report["runs"][-1]))
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Latency percentiles, throughput vs concurrency and peak RSS of each liveness/embedding stage.
+
+Stages, each timed per call:
+  decode       base64 JPEG -> downscaled frame (LivenessService.decode_for_detection)
+  detect       FaceDetector.detect on the decoded frame, one detector per thread
+  blink        BlinkDetector.detect_batch over --blink-frames eye landmark sets, one detector per thread
+  blink_burst  LivenessService.validate_blink on --blink-frames slightly shifted frames (decode,
+               detection/tracking and EAR), detector pool sized to the concurrency
+  embed        FaceEmbedding.generate_embedding on the --image face (alignment + ArcFace inference),
+               one session shared by all threads; skipped when --embedding-model is missing or
+               does not load, or when --image has no face
+  verify       IdentityStore.verify against a synthetic --gallery of unit vectors
+  end_to_end   LivenessService.validate_liveness on a full request (3 poses + blink frames),
+               detector pool sized to concurrency x --parallel so each request can fan out
+
+Every stage x concurrency run happens in a fresh spawned process, so peak_rss_mb is that
+run's own high-water mark (setup included) and runs do not warm each other's caches.
+Frames come from --image; without it a seeded synthetic frame is used and detect/end_to_end
+measure the no-face path. Nothing touches the network.
+
+    python -m benchmarks.pipeline --image face.jpg --concurrency 1 2 4 --json before.json
+    python -m benchmarks.pipeline --image face.jpg --concurrency 1 2 4 --compare before.json
+"""
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from benchmarks.ann_recall import percentile_ms
+
+STAGES = ("decode", "detect", "blink", "blink_burst", "embed", "verify", "end_to_end")
+
+
+class StageSkipped(Exception):
+    """A stage that cannot run here (e.g. no model file); reported instead of timed."""
+
+
+def load_frame(image, seed):
+    if image:
+        frame = cv2.imread(image)
+        if frame is None:
+            raise SystemExit(f"Could not read {image}")
+        return frame
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8), (0, 0), 3)
+    cv2.ellipse(frame, (320, 240), (110, 150), 0, 0, 360, (140, 170, 210), -1)
+    return frame
+
+
+def encode_frames(frame, count):
+    # Distinct JPEG qualities give distinct payloads, as consecutive camera frames would be.
+    return [base64.b64encode(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90 - i % 10])[1]).decode()
+            for i in range(count)]
+
+
+def shifted_frames(frame, count, seed):
+    # Small head movement between burst frames, so each frame differs in content, not just encoding.
+    rng = np.random.default_rng(seed)
+    h, w = frame.shape[:2]
+    return [cv2.warpAffine(frame, np.float32([[1, 0, rng.normal(0, 3)], [0, 1, rng.normal(0, 3)]]), (w, h))
+            for _ in range(count)]
+
+
+def eye_sequence(frame, frames, seed):
+    from src.face_detector import FaceDetector
+
+    face = FaceDetector().detect(frame)
+    if face.detected:
+        left, right = face.left_eye_landmarks, face.right_eye_landmarks
+    else:
+        # Open-eye outline (EAR ~0.3) for the no-face case.
+        left = np.array([[0, 0], [10, -3], [20, -3], [30, 0], [20, 3], [10, 3]], dtype=np.float32)
+        right = left + 60
+    rng = np.random.default_rng(seed)
+    # Squash the eyes vertically for a few frames in the middle so the sequence contains a blink.
+    scale = np.ones(frames, dtype=np.float32)
+    scale[frames // 2: frames // 2 + 3] = 0.3
+    def stack(eye):
+        centre = eye.mean(axis=0)
+        seq = np.repeat(eye[None], frames, axis=0) - centre
+        seq[:, :, 1] *= scale[:, None]
+        return seq + centre + rng.normal(0, 0.2, seq.shape).astype(np.float32)
+    return stack(left), stack(right)
+
+
+def build_stage(stage, args):
+    """Returns (setup_per_thread, call) for one stage; setup runs once in each worker thread."""
+    frame = load_frame(args.image, args.seed)
+
+    if stage == "decode":
+        from api.liveness_service import LivenessService
+        service = LivenessService(frame_cache_size=0, pool_size=1)
+        payload = encode_frames(frame, 1)[0]
+        return (lambda: None), (lambda state: service.decode_for_detection(payload))
+
+    if stage == "detect":
+        from api.liveness_service import LivenessService
+        from src.face_detector import FaceDetector
+        detect_frame, _ = LivenessService(frame_cache_size=0, pool_size=1).decode_for_detection(encode_frames(frame, 1)[0])
+        setup = lambda: FaceDetector(max_side=int(os.environ.get("LIVENESS_MAX_SIDE", 640)) or None)
+        return setup, (lambda detector: detector.detect(detect_frame))
+
+    if stage == "blink":
+        from src.blink_detector import BlinkDetector
+        left, right = eye_sequence(frame, args.blink_frames, args.seed)
+        def call(detector):
+            detector.reset()
+            return detector.detect_batch(left, right)
+        return BlinkDetector, call
+
+    if stage == "blink_burst":
+        from api.liveness_service import LivenessService
+        service = LivenessService(frame_cache_size=0, pool_size=args.concurrency)
+        service.warm_up()
+        burst = [encode_frames(f, 1)[0] for f in shifted_frames(frame, args.blink_frames, args.seed)]
+        return (lambda: None), (lambda state: service.validate_blink(burst))
+
+    if stage == "embed":
+        from src.embedding import FaceEmbedding, SessionConfig
+        from src.face_detector import FaceDetector
+        if not os.path.exists(args.embedding_model):
+            raise StageSkipped(f"{args.embedding_model} not found")
+        face = FaceDetector().detect(frame)
+        if not face.detected:
+            raise StageSkipped("no face in --image")
+        embedder = FaceEmbedding(args.embedding_model, session_config=SessionConfig.from_env())
+        if not embedder.warm_up():
+            raise StageSkipped(f"{args.embedding_model} could not be loaded")
+        return (lambda: None), (lambda state: embedder.generate_embedding(frame, face.landmarks))
+
+    if stage == "verify":
+        from benchmarks.ann_recall import synthetic_gallery
+        from src.embedding import IdentityStore
+        from src.vector_index import FlatIndex, normalise
+        rng, centres, enrolled = synthetic_gallery(args.gallery, 512, 256, 0.036, args.seed)
+        keys = [str(i) for i in range(args.gallery)]
+        store = IdentityStore(index=FlatIndex.from_arrays(keys, enrolled))
+        probe_ids = rng.integers(0, args.gallery, 1024)
+        probes = normalise(centres[probe_ids] + 0.036 * rng.standard_normal((1024, 512))).astype(np.float32)
+        counter = iter(range(1 << 62))
+        def call(state):
+            i = next(counter) % len(probes)
+            return store.verify(keys[probe_ids[i]], probes[i], True)
+        return (lambda: None), call
+
+    if stage == "end_to_end":
+        from api.liveness_service import LivenessService
+        service = LivenessService(frame_cache_size=0, pool_size=args.concurrency * args.parallel,
+                                  parallel=args.parallel)
+        service.warm_up()
+        poses = encode_frames(frame, 3)
+        frames = {"right": poses[0], "left": poses[1], "center": poses[2],
+                  "blink": encode_frames(frame, args.blink_frames)}
+        return (lambda: None), (lambda state: service.validate_liveness(frames))
+
+    raise ValueError(f"Unknown stage '{stage}'")
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    scale = 1 if platform.system() == "Darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20, 1)
+
+
+def run_stage(stage, args):
+    cv2.setNumThreads(args.cv_threads)
+    try:
+        setup, call = build_stage(stage, args)
+    except StageSkipped as e:
+        return {"stage": stage, "concurrency": args.concurrency, "skipped": str(e)}
+    local = threading.local()
+
+    def timed():
+        start = time.perf_counter()
+        call(local.state)
+        return time.perf_counter() - start
+
+    setup_rss = peak_rss_mb()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        # Each thread builds its state and warms up before the timed window.
+        barrier = threading.Barrier(args.concurrency)
+        def prepare():
+            local.state = setup() or True
+            for _ in range(args.warmup):
+                call(local.state)
+            barrier.wait()
+        list(pool.map(lambda _: prepare(), range(args.concurrency)))
+
+        start = time.perf_counter()
+        latencies = list(pool.map(lambda _: timed(), range(args.iterations)))
+        wall = time.perf_counter() - start
+
+    return {
+        "stage": stage, "concurrency": args.concurrency, "iterations": args.iterations,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 3),
+        "throughput_per_s": round(args.iterations / wall, 1),
+        "setup_rss_mb": setup_rss,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def compare(runs, baseline_path):
+    """Relative change of p50/p95/p99 and throughput against a previous --json report."""
+    with open(baseline_path) as f:
+        baseline = {(r["stage"], r["concurrency"]): r for r in json.load(f)["runs"]}
+    changes = []
+    for run in runs:
+        before = baseline.get((run["stage"], run["concurrency"]))
+        if before is None or "skipped" in run or "skipped" in before:
+            continue
+        entry = {"stage": run["stage"], "concurrency": run["concurrency"]}
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s", "peak_rss_mb"):
+            if before.get(key):
+                entry[key] = f"{(run[key] - before[key]) / before[key] * 100:+.1f}%"
+        changes.append(entry)
+    return changes
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        commit = ""
+    import mediapipe
+    import onnxruntime
+    return {
+        "commit": commit or None, "python": platform.python_version(), "platform": platform.platform(),
+        "cpus": os.cpu_count(), "numpy": np.__version__, "opencv": cv2.__version__,
+        "mediapipe": mediapipe.__version__, "onnxruntime": onnxruntime.__version__
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="face photo used for every frame; synthetic frame if omitted")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per stage and concurrency")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed calls per worker thread")
+    parser.add_argument("--blink-frames", type=int, default=10)
+    parser.add_argument("--gallery", type=int, default=100_000)
+    parser.add_argument("--embedding-model", default=os.environ.get("EMBEDDING_MODEL", "buffalo_sc/w600k_mbf.onnx"),
+                        help="ArcFace ONNX model for the embed stage")
+    parser.add_argument("--parallel", type=int, default=1,
+                        help="detectors one end_to_end request may fan out over (LIVENESS_PARALLEL)")
+    parser.add_argument("--cv-threads", type=int, default=1, help="cv2.setNumThreads in each run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this path")
+    parser.add_argument("--compare", help="previous --json report to diff against")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    report = {"environment": environment(), "config": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+              "runs": []}
+    for stage in args.stages:
+        for concurrency in args.concurrency:
+            run_args = argparse.Namespace(**{**vars(args), "concurrency": concurrency})
+            with ctx.Pool(1) as pool:
+                entry = pool.apply(run_stage, (stage, run_args))
+            report["runs"].append(entry)
+            print(json.dumps(entry))
+
+    if args.compare:
+        report["compare"] = {"baseline": args.compare, "changes": compare(report["runs"], args.compare)}
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
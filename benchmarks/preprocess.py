@@ -0,0 +1,94 @@
+"""Latency and allocations of the embedding preprocessing path, per face.
+
+legacy: lstsq affine + warpAffine + cvtColor + astype + normalise + transpose + expand_dims
+fused:  FacePreprocessor (closed-form similarity + warpAffine into a reused crop + a strided
+        BGR->RGB CHW copy into a reused NCHW batch, normalised in place)
+
+Allocations are numpy bytes seen by tracemalloc (OpenCV's own buffers are not visible to it).
+
+    python -m benchmarks.preprocess --image face.jpg
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from src.embedding import ARCFACE_DST, FacePreprocessor, arcface_points, estimate_similarity
+from src.face_detector import FaceDetector
+
+
+def estimate_affine(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    # The 6-DOF least-squares affine align_face used before the similarity transform.
+    num = src.shape[0]
+    src_pad = np.hstack([src, np.ones((num, 1))])
+    M, _, _, _ = np.linalg.lstsq(src_pad, dst, rcond=None)
+    return M.T
+
+
+def legacy(frame, landmarks):
+    left_eye = landmarks[[33, 133]].mean(axis=0)
+    right_eye = landmarks[[362, 263]].mean(axis=0)
+    src_pts = np.array([left_eye, right_eye, landmarks[1], landmarks[61], landmarks[291]], dtype=np.float32)
+    aligned = cv2.warpAffine(frame, estimate_affine(src_pts, ARCFACE_DST), (112, 112), borderValue=0)
+    img = cv2.cvtColor(aligned, cv2.COLOR_BGR2RGB)
+    img = (img.astype(np.float32) - 127.5) / 127.5
+    return np.expand_dims(np.transpose(img, (2, 0, 1)), axis=0)
+
+
+def measure(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"us": round(elapsed * 1e6, 1), "peak_alloc_bytes": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--json", help="write results to this path")
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image)
+    face = FaceDetector().detect(frame)
+    if not face.detected:
+        raise SystemExit(f"No face found in {args.image}")
+    landmarks = face.landmarks
+
+    preprocessor = FacePreprocessor()
+    out = preprocessor.batch(1)
+    fused = lambda: preprocessor.align_into(frame, landmarks, out[0])
+    preprocessor.align_into(frame, landmarks, out[0])
+
+    # Same output as the legacy chain when both use the similarity transform.
+    reference = cv2.warpAffine(frame, estimate_similarity(arcface_points(landmarks), ARCFACE_DST), (112, 112))
+    reference = np.transpose((cv2.cvtColor(reference, cv2.COLOR_BGR2RGB).astype(np.float32) - 127.5) / 127.5, (2, 0, 1))
+
+    report = {
+        "legacy": measure(lambda: legacy(frame, landmarks), args.repeat),
+        "fused": measure(fused, args.repeat),
+        "transform_us": {
+            "lstsq": measure(lambda: estimate_affine(arcface_points(landmarks), ARCFACE_DST), args.repeat)["us"],
+            "umeyama": measure(lambda: estimate_similarity(arcface_points(landmarks), ARCFACE_DST), args.repeat)["us"],
+        },
+        "max_abs_diff_vs_unfused": float(np.abs(out[0] - reference).max())
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
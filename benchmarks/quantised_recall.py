@@ -0,0 +1,96 @@
+"""Memory, recall@k and similarity error of QuantizedIndex against the exact FlatIndex scan.
+
+Uses the same synthetic gallery as ann_recall. For each code dtype it reports the
+bytes per row, scan latency, recall@k and the largest absolute error of the returned
+similarities in three modes: codes_only (a heap-built index, no full-precision rows),
+mapped (built from a memory-mapped float32 .npy, as IdentityStore.load does, and
+re-ranked against it) and keep_full (a float32 heap copy). Errors are 0 when re-ranked.
+
+    python -m benchmarks.quantised_recall --gallery 200000 --rerank 32
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.ann_recall import percentile_ms, synthetic_gallery
+from src.vector_index import FlatIndex, QuantizedIndex, normalise
+
+
+def evaluate(index, queries, exact, exact_scores, k):
+    hits, times, error = 0, [], 0.0
+    truth_scores = [dict(zip(keys, scores)) for keys, scores in zip(exact, exact_scores)]
+    for q, truth, scores in zip(queries, exact, truth_scores):
+        t = time.perf_counter()
+        keys, sims = index.search(q, k)
+        times.append(time.perf_counter() - t)
+        hits += len(set(keys) & set(truth))
+        for key, sim in zip(keys, sims):
+            if key in scores:
+                error = max(error, abs(float(sim) - float(scores[key])))
+    return {
+        f"recall@{k}": round(hits / (len(queries) * k), 4),
+        "max_abs_error": round(error, 6),
+        "p50_ms": percentile_ms(times, 50),
+        "p95_ms": percentile_ms(times, 95)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gallery", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--noise", type=float, default=0.036, help="per-dimension noise std of each sample")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this path")
+    args = parser.parse_args()
+
+    rng, centres, enrolled = synthetic_gallery(args.gallery, args.dim, args.clusters, args.noise, args.seed)
+    keys = [str(i) for i in range(args.gallery)]
+    query_ids = rng.choice(args.gallery, size=args.queries, replace=False)
+    queries = normalise(centres[query_ids] + args.noise * rng.standard_normal((args.queries, args.dim)))
+
+    flat = FlatIndex.from_arrays(keys, enrolled)
+    exact, exact_scores, exact_times = [], [], []
+    for q in queries:
+        t = time.perf_counter()
+        found, scores = flat.search(q, args.k)
+        exact_times.append(time.perf_counter() - t)
+        exact.append(found)
+        exact_scores.append(scores)
+
+    report = {
+        "gallery": args.gallery, "dim": args.dim, "k": args.k, "rerank": args.rerank, "queries": args.queries,
+        "float32": {"bytes_per_row": args.dim * 4, "p50_ms": percentile_ms(exact_times, 50),
+                    "p95_ms": percentile_ms(exact_times, 95)},
+        "quantised": []
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vectors.npy")
+        np.save(path, enrolled)
+        mapped = np.load(path, mmap_mode="r")
+        for dtype in QuantizedIndex.CODE_DTYPES:
+            entry = {"dtype": dtype, "bytes_per_row": np.dtype(dtype).itemsize * args.dim + 4}
+            for mode, keep_full, rows in (("codes_only", False, enrolled), ("mapped", False, mapped),
+                                          ("keep_full", True, enrolled)):
+                index = QuantizedIndex(dtype, rerank=args.rerank, keep_full=keep_full)
+                index.extend(keys, rows)
+                entry[mode] = evaluate(index, queries, exact, exact_scores, args.k)
+            report["quantised"].append(entry)
+        del mapped
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,29 @@
-from .face_detector import FaceDetector, FaceDetectionResult
-from .blink_detector import BlinkDetector, BlinkDetectionResult, LivenessStatus
-from .embedding import FaceEmbedding, EmbeddingResult, IdentityStore
+import importlib
+from typing import Any, List
+
+# Submodules load on first attribute access (PEP 562): face_detector needs mediapipe and cv2,
+# embedding needs onnxruntime, and `import src` alone should not pay for either.
+_EXPORTS = {
+    "face_detector": ["FaceDetector", "FaceDetectionResult", "FaceTracker"],
+    "blink_detector": ["BlinkDetector", "BlinkDetectionResult", "BlinkSampler", "LivenessStatus"],
+    "embedding": ["FaceEmbedding", "EmbeddingBatcher", "EmbeddingResult", "IdentityStore", "IdentificationMatch",
+                  "SessionConfig"],
+    "vector_index": ["VectorIndex", "FlatIndex", "IVFIndex", "QuantizedIndex"],
+    "gallery": ["GalleryFile"],
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name: str) -> Any:
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,7 +1,6 @@
 import numpy as np
 from dataclasses import dataclass
-from typing import Optional
-from scipy.spatial import distance as dist
+from typing import Callable, Dict, List, Optional, Tuple
 from enum import Enum
 
 
@@ -40,23 +39,22 @@ class BlinkDetector:
         self._liveness_status = LivenessStatus.WAITING_BLINK
 
     @staticmethod
-    def calculate_ear(eye_landmarks: np.ndarray) -> float:
-        v1 = dist.euclidean(eye_landmarks[1], eye_landmarks[5])
-        v2 = dist.euclidean(eye_landmarks[2], eye_landmarks[4])
-        h = dist.euclidean(eye_landmarks[0], eye_landmarks[3])
-        return (v1 + v2) / (2.0 * h) if h != 0 else 0.0
+    def calculate_ear_batch(eye_landmarks: np.ndarray) -> np.ndarray:
+        # (N, 6, 2) eye landmarks -> (N,) eye aspect ratios
+        eyes = np.asarray(eye_landmarks, dtype=np.float64)
+        v1 = np.linalg.norm(eyes[:, 1] - eyes[:, 5], axis=-1)
+        v2 = np.linalg.norm(eyes[:, 2] - eyes[:, 4], axis=-1)
+        h = np.linalg.norm(eyes[:, 0] - eyes[:, 3], axis=-1)
+        ear = np.zeros_like(h)
+        np.divide(v1 + v2, 2.0 * h, out=ear, where=h != 0)
+        return ear
 
-    def detect(self, left_eye: Optional[np.ndarray], right_eye: Optional[np.ndarray]) -> BlinkDetectionResult:
-        if left_eye is None or right_eye is None:
-            self._liveness_status = LivenessStatus.NO_FACE
-            return BlinkDetectionResult(0.0, 0.0, 0.0, False, self._blink_count, self._liveness_status, False)
+    @staticmethod
+    def calculate_ear(eye_landmarks: np.ndarray) -> float:
+        return float(BlinkDetector.calculate_ear_batch(np.asarray(eye_landmarks)[None])[0])
 
-        ear_left = self.calculate_ear(left_eye)
-        ear_right = self.calculate_ear(right_eye)
-        ear_avg = (ear_left + ear_right) / 2.0
-        eyes_open = ear_avg >= self.open_threshold
+    def _update(self, ear_avg: float) -> bool:
         is_blinking = False
-
         if ear_avg < self.ear_threshold:
             self._frame_counter += 1
             self._liveness_status = LivenessStatus.EYES_CLOSED
@@ -71,9 +69,143 @@ class BlinkDetector:
                 self._liveness_status = LivenessStatus.WAITING_BLINK
             self._frame_counter = 0
             self._was_closed = False
+        return is_blinking
+
+    def detect(self, left_eye: Optional[np.ndarray], right_eye: Optional[np.ndarray]) -> BlinkDetectionResult:
+        if left_eye is None or right_eye is None:
+            self._liveness_status = LivenessStatus.NO_FACE
+            return BlinkDetectionResult(0.0, 0.0, 0.0, False, self._blink_count, self._liveness_status, False)
+
+        ear_left = self.calculate_ear(left_eye)
+        ear_right = self.calculate_ear(right_eye)
+        ear_avg = (ear_left + ear_right) / 2.0
+        is_blinking = self._update(ear_avg)
+        return BlinkDetectionResult(ear_left, ear_right, ear_avg, is_blinking, self._blink_count,
+                                    self._liveness_status, ear_avg >= self.open_threshold)
+
+    def detect_batch(self, left_eyes: np.ndarray, right_eyes: np.ndarray) -> List[BlinkDetectionResult]:
+        # Frames must be in capture order; EAR is computed for the whole sequence at once.
+        return self.detect_ears(self.calculate_ear_batch(left_eyes), self.calculate_ear_batch(right_eyes))
 
-        return BlinkDetectionResult(ear_left, ear_right, ear_avg, is_blinking, self._blink_count, self._liveness_status, eyes_open)
+    def detect_ears(self, ear_left: np.ndarray, ear_right: np.ndarray) -> List[BlinkDetectionResult]:
+        # detect_batch for eye aspect ratios that were already computed.
+        ear_left = np.asarray(ear_left, dtype=np.float64)
+        ear_right = np.asarray(ear_right, dtype=np.float64)
+        ear_avg = (ear_left + ear_right) / 2.0
+        results = []
+        for el, er, ea in zip(ear_left.tolist(), ear_right.tolist(), ear_avg.tolist()):
+            is_blinking = self._update(ea)
+            results.append(BlinkDetectionResult(el, er, ea, is_blinking, self._blink_count,
+                                                self._liveness_status, ea >= self.open_threshold))
+        return results
+
+    def frames_to_blink(self) -> int:
+        # Fewest further frames that could still complete a blink from the current state.
+        if self._was_closed:
+            return 1
+        return max(self.consecutive_frames - self._frame_counter, 0) + 1
 
     @property
     def blink_count(self) -> int:
         return self._blink_count
+
+
+class BlinkSampler:
+    """Feeds a BlinkDetector only the frames of a burst that can change its count.
+
+    Every `stride`-th frame is looked at first. One that is not fully open (EAR below
+    open_threshold, or no face) marks a possible dip: the frames since the previous sample
+    are backfilled and every frame after it is processed until the eyes are open again.
+    Frames reach the detector in capture order, and skipped frames only ever sit between
+    two open samples, so with stride <= consecutive_frames the count equals the dense one;
+    a larger stride only misses closed runs shorter than the stride whose neighbouring
+    samples are both fully open.
+
+    EAR is computed once per frame looked at. The frames chosen are fed to the detector in
+    one detect_ears batch at the end, or one at a time with fail_fast so the run can stop
+    as soon as the outcome is settled.
+
+    The sample positions move whenever a dip is followed, so the frames worth decoding ahead
+    are only known as the run goes: upcoming, if given, is called with the next frames the
+    sampler expects to look at (at most `ahead`, in order) each time that changes, and with
+    an empty list when the run ends.
+    """
+
+    def __init__(self, detector: BlinkDetector, stride: int):
+        self.detector = detector
+        self.stride = max(1, stride)
+        self.frames_looked = 0
+        self.frames_processed = 0
+
+    def _is_open(self, ears: Optional[Tuple[float, float]]) -> bool:
+        return ears is not None and (ears[0] + ears[1]) / 2.0 >= self.detector.open_threshold
+
+    def run(self, count: int, get_eyes: Callable[[int], Optional[Tuple[np.ndarray, np.ndarray]]],
+            fail_fast: bool = False, upcoming: Optional[Callable[[List[int]], None]] = None,
+            ahead: int = 2) -> int:
+        """Runs over frames 0..count-1; get_eyes(i) is called at most once per frame. Returns the blink count.
+
+        With fail_fast, stops once a blink is seen or too few frames remain to complete one."""
+        seen: Dict[int, Optional[Tuple[float, float]]] = {}
+        pending: List[Tuple[float, float]] = []
+
+        def look(i: int) -> Optional[Tuple[float, float]]:
+            if i not in seen:
+                eyes = get_eyes(i)
+                self.frames_looked += 1
+                seen[i] = None if eyes is None else tuple(BlinkDetector.calculate_ear_batch(np.stack(eyes)).tolist())
+            return seen[i]
+
+        def feed(i: int):
+            ears = look(i)
+            if ears is None:
+                return
+            self.frames_processed += 1
+            pending.append(ears)
+            if fail_fast:
+                flush()
+
+        def flush():
+            if pending:
+                ears = np.asarray(pending)
+                self.detector.detect_ears(ears[:, 0], ears[:, 1])
+                pending.clear()
+
+        def announce(start: int, step: int):
+            # Frames from start on at this step (the last frame included, as the run does).
+            if upcoming is None:
+                return
+            plan = [j for j in range(start, count, step) if j not in seen][:ahead]
+            if step > 1 and len(plan) < ahead and count - 1 not in seen and count - 1 not in plan:
+                plan.append(count - 1)
+            upcoming(plan)
+
+        fed = -1
+        i = 0
+        while i < count:
+            if fail_fast and (self.detector.blink_count >= 1
+                              or count - fed - 1 < self.detector.frames_to_blink()):
+                break
+            announce(i, self.stride)
+            if self._is_open(look(i)):
+                feed(i)
+                fed = i
+            else:
+                announce(fed + 1, 1)
+                for j in range(fed + 1, i + 1):
+                    feed(j)
+                fed = i
+                while fed + 1 < count:
+                    fed += 1
+                    announce(fed, 1)
+                    feed(fed)
+                    if self._is_open(look(fed)) or (fail_fast and self.detector.blink_count >= 1):
+                        break
+            i = fed + self.stride
+            # Always look at the last frame: a dip just before it could still end in a blink.
+            if i >= count and fed < count - 1:
+                i = count - 1
+        if upcoming is not None:
+            upcoming([])
+        flush()
+        return self.detector.blink_count
@@ -1,9 +1,16 @@
 import numpy as np
 import cv2
 import onnxruntime as ort
+from concurrent.futures import Future
 from dataclasses import dataclass
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict
 import os
+import queue
+import threading
+import time
+
+from .gallery import OP_PUT, GalleryFile
+from .vector_index import FlatIndex, QuantizedIndex, VectorIndex, normalise
 
 
 @dataclass
@@ -13,6 +20,13 @@ class EmbeddingResult:
     error_message: Optional[str] = None
 
 
+@dataclass
+class IdentificationMatch:
+    identity_id: str
+    similarity: float
+    matched: bool
+
+
 @dataclass
 class VerificationResult:
     verified: bool
@@ -28,32 +42,164 @@ ARCFACE_DST = np.array([
 ], dtype=np.float32)
 
 
-def estimate_affine(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
-    num = src.shape[0]
-    src_pad = np.hstack([src, np.ones((num, 1))])
-    M, _, _, _ = np.linalg.lstsq(src_pad, dst, rcond=None)
-    return M.T
+def estimate_similarity(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Closed-form least-squares similarity transform (Umeyama, 2-D, no reflection) as a 2x3 matrix.
+
+    For five points plain float arithmetic beats numpy's per-call overhead several times over.
+    """
+    src_pts, dst_pts = src.tolist(), dst.tolist()
+    n = len(src_pts)
+    sx = sum(p[0] for p in src_pts) / n
+    sy = sum(p[1] for p in src_pts) / n
+    dx = sum(p[0] for p in dst_pts) / n
+    dy = sum(p[1] for p in dst_pts) / n
+    # a = scale * cos(theta), b = scale * sin(theta) of the best-fitting rotation.
+    a = b = norm = 0.0
+    for (x, y), (u, v) in zip(src_pts, dst_pts):
+        x, y, u, v = x - sx, y - sy, u - dx, v - dy
+        a += x * u + y * v
+        b += x * v - y * u
+        norm += x * x + y * y
+    a /= norm + 1e-12
+    b /= norm + 1e-12
+    return np.array([[a, -b, dx - (a * sx - b * sy)], [b, a, dy - (b * sx + a * sy)]])
+
+
+# Eye corners are averaged into eye centres; nose tip and mouth corners are repeated so
+# one reshape + mean yields all five ArcFace reference points.
+_ARCFACE_LANDMARKS = np.array([33, 133, 362, 263, 1, 1, 61, 61, 291, 291])
+
+
+def arcface_points(landmarks: np.ndarray) -> np.ndarray:
+    return landmarks[_ARCFACE_LANDMARKS].reshape(5, 2, 2).mean(axis=1, dtype=np.float32)
 
 
 def align_face(frame: np.ndarray, landmarks: np.ndarray) -> Optional[np.ndarray]:
     try:
-        left_eye = landmarks[[33, 133]].mean(axis=0)
-        right_eye = landmarks[[362, 263]].mean(axis=0)
-        src_pts = np.array([
-            left_eye, right_eye, landmarks[1], landmarks[61], landmarks[291]
-        ], dtype=np.float32)
-        M = estimate_affine(src_pts, ARCFACE_DST)
+        M = estimate_similarity(arcface_points(landmarks), ARCFACE_DST)
         return cv2.warpAffine(frame, M, (112, 112), borderValue=0)
     except:
         return None
 
 
+class FacePreprocessor:
+    """Aligns faces straight into a reusable (N, 3, 112, 112) float32 batch.
+
+    Per face: one warpAffine into a preallocated 112x112 crop, one strided copy that swaps
+    BGR to RGB and transposes to CHW while widening to float32, and in-place normalisation.
+    No temporaries are allocated. Not thread-safe; FaceEmbedding keeps one per thread.
+    """
+
+    def __init__(self, capacity: int = 1):
+        self._crop = np.empty((112, 112, 3), dtype=np.uint8)
+        self._batch = np.empty((max(1, capacity), 3, 112, 112), dtype=np.float32)
+
+    def batch(self, n: int) -> np.ndarray:
+        if n > self._batch.shape[0]:
+            self._batch = np.empty((max(n, self._batch.shape[0] * 2), 3, 112, 112), dtype=np.float32)
+        return self._batch[:n]
+
+    def align_into(self, frame: np.ndarray, landmarks: np.ndarray, out: np.ndarray) -> bool:
+        try:
+            M = estimate_similarity(arcface_points(landmarks), ARCFACE_DST)
+            cv2.warpAffine(frame, M, (112, 112), dst=self._crop, borderValue=0)
+        except Exception:
+            return False
+        # Channel-reversed CHW view of the crop: RGB planes without copying.
+        np.copyto(out, self._crop.transpose(2, 0, 1)[::-1], casting="unsafe")
+        out *= np.float32(1 / 127.5)
+        out -= np.float32(1.0)
+        return True
+
+
+_OPT_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+@dataclass
+class SessionConfig:
+    """ONNX Runtime session settings; 0 threads means ORT's default (one per physical core)."""
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    optimization_level: str = "all"
+    execution_mode: str = "sequential"
+    cpu_mem_arena: bool = True
+    mem_pattern: bool = True
+    io_binding: bool = False
+
+    def __post_init__(self):
+        if self.optimization_level not in _OPT_LEVELS:
+            raise ValueError(f"Unknown optimization level '{self.optimization_level}', expected one of {tuple(_OPT_LEVELS)}")
+        if self.execution_mode not in _EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{self.execution_mode}', expected one of {tuple(_EXECUTION_MODES)}")
+
+    @classmethod
+    def from_env(cls, prefix: str = "EMBEDDING_ORT_") -> "SessionConfig":
+        env = lambda name, default: os.environ.get(prefix + name, default)
+        return cls(
+            intra_op_threads=int(env("INTRA_OP_THREADS", 0)),
+            inter_op_threads=int(env("INTER_OP_THREADS", 0)),
+            optimization_level=env("OPT_LEVEL", "all"),
+            execution_mode=env("EXECUTION_MODE", "sequential"),
+            cpu_mem_arena=env("MEM_ARENA", "1") == "1",
+            mem_pattern=env("MEM_PATTERN", "1") == "1",
+            io_binding=env("IO_BINDING", "0") == "1",
+        )
+
+    def session_options(self) -> ort.SessionOptions:
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.graph_optimization_level = _OPT_LEVELS[self.optimization_level]
+        options.execution_mode = _EXECUTION_MODES[self.execution_mode]
+        options.enable_cpu_mem_arena = self.cpu_mem_arena
+        options.enable_mem_pattern = self.mem_pattern
+        return options
+
+
+class _BoundBuffers:
+    """Input/output arrays bound once to an IOBinding and reused for every call of one batch size."""
+
+    def __init__(self, session: ort.InferenceSession, input_name: str, output_name: str,
+                 batch: int, output_dim: int):
+        self.input = np.empty((batch, 3, 112, 112), dtype=np.float32)
+        self.output = np.empty((batch, output_dim), dtype=np.float32)
+        self.binding = session.io_binding()
+        self.binding.bind_input(input_name, 'cpu', 0, np.float32, self.input.shape, self.input.ctypes.data)
+        self.binding.bind_output(output_name, 'cpu', 0, np.float32, self.output.shape, self.output.ctypes.data)
+
+
 class FaceEmbedding:
-    def __init__(self, model_path: str = "buffalo_sc/w600k_mbf.onnx"):
+    MAX_BOUND_BATCHES = 8
+
+    def __init__(self, model_path: str = "buffalo_sc/w600k_mbf.onnx", optimized_model_path: Optional[str] = None,
+                 session_config: Optional[SessionConfig] = None):
         self.model_path = model_path
+        # Where to cache the graph-optimised model so later boots skip the optimisation passes.
+        self.optimized_model_path = optimized_model_path
+        self.session_config = session_config or SessionConfig()
         self._session = None
         self._initialized = False
         self._input_name = None
+        self._output_name = None
+        self._output_dim: Optional[int] = None
+        self._dynamic_batch = False
+        # Per-thread state: FacePreprocessor and the IOBinding buffers, keyed by batch size.
+        self._local = threading.local()
+
+    def _preprocessor(self) -> FacePreprocessor:
+        preprocessor = getattr(self._local, "preprocessor", None)
+        if preprocessor is None:
+            preprocessor = self._local.preprocessor = FacePreprocessor()
+        return preprocessor
 
     def _init_model(self) -> bool:
         if self._initialized:
@@ -66,36 +212,127 @@ class FaceEmbedding:
             return False
 
         try:
-            self._session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
-            self._input_name = self._session.get_inputs()[0].name
+            self._session = self._create_session(model_path)
+            model_input = self._session.get_inputs()[0]
+            self._input_name = model_input.name
+            model_output = self._session.get_outputs()[0]
+            self._output_name = model_output.name
+            self._output_dim = model_output.shape[-1] if isinstance(model_output.shape[-1], int) else None
+            # Exported with a symbolic batch dim (e.g. 'None') the model takes (N, 3, 112, 112).
+            self._dynamic_batch = not isinstance(model_input.shape[0], int)
             self._initialized = True
             return True
-        except:
+        except Exception as e:
+            print(f"Failed to load embedding model {model_path}: {e}")
+            return False
+
+    def _create_session(self, model_path: str) -> ort.InferenceSession:
+        target = self.optimized_model_path
+        if target:
+            if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(model_path):
+                # Extended is the highest level whose output is hardware independent; the layout
+                # passes of ORT_ENABLE_ALL still run (cheaply) when the cached file is loaded.
+                # Each process writes its own file and renames it into place, so workers starting
+                # together never load a model another one is still writing.
+                root, ext = os.path.splitext(target)
+                tmp = f"{root}.{os.getpid()}.tmp{ext}"
+                options = ort.SessionOptions()
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+                options.optimized_model_filepath = tmp
+                os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                try:
+                    ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+                    os.replace(tmp, target)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+            model_path = target
+        return ort.InferenceSession(model_path, self.session_config.session_options(),
+                                    providers=['CPUExecutionProvider'])
+
+    @property
+    def model_loaded(self) -> bool:
+        return self._initialized
+
+    def warm_up(self) -> bool:
+        """Load the model and run one dummy batch so the first real call skips session setup."""
+        if not self._init_model():
             return False
+        self._infer(np.zeros((1, 3, 112, 112), dtype=np.float32))
+        return True
 
     def preprocess(self, face: np.ndarray) -> np.ndarray:
         img = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
         img = (img.astype(np.float32) - 127.5) / 127.5
         return np.expand_dims(np.transpose(img, (2, 0, 1)), axis=0)
 
+    def _bound_buffers(self, batch: int) -> _BoundBuffers:
+        # Each thread binds its own buffers, so concurrent runs never share (or wait on) them.
+        cache: Optional[Dict[int, _BoundBuffers]] = getattr(self._local, "bound", None)
+        if cache is None:
+            cache = self._local.bound = {}
+        bound = cache.get(batch)
+        if bound is None:
+            if len(cache) >= self.MAX_BOUND_BATCHES:
+                cache.pop(next(iter(cache)))
+            bound = cache[batch] = _BoundBuffers(self._session, self._input_name, self._output_name,
+                                                 batch, self._output_dim)
+        return bound
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        if not self.session_config.io_binding or self._output_dim is None:
+            return self._session.run([self._output_name], {self._input_name: batch})[0]
+        bound = self._bound_buffers(len(batch))
+        np.copyto(bound.input, batch)
+        self._session.run_with_iobinding(bound.binding)
+        return bound.output.copy()
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        if self._dynamic_batch or len(batch) == 1:
+            return self._run(batch)
+        return np.concatenate([self._run(batch[i:i + 1]) for i in range(len(batch))])
+
     def generate_embedding(self, frame: np.ndarray, landmarks: np.ndarray) -> EmbeddingResult:
+        return self.generate_embeddings([frame], [landmarks])[0]
+
+    def generate_embeddings(self, frames: List[np.ndarray], landmarks_list: List[np.ndarray],
+                            timings: Any = None) -> List[EmbeddingResult]:
+        """Embed several faces with one (N, 3, 112, 112) inference call; results keep input order.
+
+        timings, if given, receives 'align' and 'embedding' stages via start()/stop(stage, start).
+        """
         if not self._init_model():
-            return EmbeddingResult(success=False, error_message="Model not loaded")
+            return [EmbeddingResult(success=False, error_message="Model not loaded") for _ in frames]
 
-        if landmarks is None or len(landmarks) < 468:
-            return EmbeddingResult(success=False, error_message="Invalid landmarks")
+        results: List[Optional[EmbeddingResult]] = [None] * len(frames)
+        preprocessor = self._preprocessor()
+        batch = preprocessor.batch(len(frames))
+        slots = []
+        start = timings.start() if timings is not None else 0.0
+        for i, (frame, landmarks) in enumerate(zip(frames, landmarks_list)):
+            if landmarks is None or len(landmarks) < 468:
+                results[i] = EmbeddingResult(success=False, error_message="Invalid landmarks")
+                continue
+            if not preprocessor.align_into(frame, landmarks, batch[len(slots)]):
+                results[i] = EmbeddingResult(success=False, error_message="Alignment failed")
+                continue
+            slots.append(i)
+        if timings is not None:
+            timings.stop('align', start)
 
-        try:
-            aligned = align_face(frame, landmarks)
-            if aligned is None:
-                return EmbeddingResult(success=False, error_message="Alignment failed")
-
-            output = self._session.run(None, {self._input_name: self.preprocess(aligned)})
-            emb = output[0][0]
-            emb = emb / (np.linalg.norm(emb) + 1e-10)
-            return EmbeddingResult(success=True, embedding=emb)
-        except Exception as e:
-            return EmbeddingResult(success=False, error_message=str(e))
+        if slots:
+            try:
+                start = timings.start() if timings is not None else 0.0
+                embs = self._infer(batch[:len(slots)])
+                if timings is not None:
+                    timings.stop('embedding', start)
+                embs = embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-10)
+                for i, emb in zip(slots, embs):
+                    results[i] = EmbeddingResult(success=True, embedding=emb)
+            except Exception as e:
+                for i in slots:
+                    results[i] = EmbeddingResult(success=False, error_message=str(e))
+        return results
 
     @staticmethod
     def calculate_similarity(emb1: np.ndarray, emb2: np.ndarray) -> float:
@@ -112,30 +349,239 @@ class FaceEmbedding:
         return avg / (np.linalg.norm(avg) + 1e-10)
 
 
+class _StageTimes:
+    """Stage times of one batch, copied into the timings of every request that was in it."""
+
+    def __init__(self):
+        self.samples: Dict[str, float] = {}
+
+    def start(self) -> float:
+        return time.perf_counter()
+
+    def stop(self, stage: str, start: float):
+        self.samples[stage] = time.perf_counter() - start
+
+
+class EmbeddingBatcher:
+    """Micro-batching front for FaceEmbedding shared by concurrent request threads.
+
+    The first queued face opens a window of max_wait_ms; everything that arrives before
+    it closes (up to max_batch faces) runs as a single generate_embeddings call.
+    """
+
+    def __init__(self, embedder: FaceEmbedding, max_batch: int = 16, max_wait_ms: float = 2.0):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, frame: np.ndarray, landmarks: np.ndarray, timings: Any = None) -> Future:
+        """timings, if given, gets the 'align' and 'embedding' times of the batch the face ran in
+        via add(stage, seconds), before the future resolves."""
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((frame, landmarks, future, timings))
+        return future
+
+    def generate_embedding(self, frame: np.ndarray, landmarks: np.ndarray) -> EmbeddingResult:
+        return self.submit(frame, landmarks).result()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0
+        }
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> Optional[list]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            stages = _StageTimes() if any(b[3] is not None for b in batch) else None
+            try:
+                results = self.embedder.generate_embeddings([b[0] for b in batch], [b[1] for b in batch], stages)
+            except Exception as e:
+                results = [EmbeddingResult(success=False, error_message=str(e))] * len(batch)
+            self.batches += 1
+            self.items += len(batch)
+            for (_, _, future, timings), result in zip(batch, results):
+                if timings is not None:
+                    for stage, seconds in stages.samples.items():
+                        timings.add(stage, seconds)
+                future.set_result(result)
+
+    def close(self):
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join()
+
+
 class IdentityStore:
-    def __init__(self, similarity_threshold: float = 0.35):
+    """Enrolled embeddings behind a pluggable VectorIndex (exact FlatIndex by default)."""
+
+    def __init__(self, similarity_threshold: float = 0.35, index: Optional[VectorIndex] = None,
+                 gallery: Optional[GalleryFile] = None, compact_every: int = 10000):
         self.similarity_threshold = similarity_threshold
-        self._identities: Dict[str, np.ndarray] = {}
+        self.index = index if index is not None else FlatIndex()
+        self.gallery = gallery
+        self.compact_every = compact_every
+        # A lossy index (QuantizedIndex) only returns approximations of what was enrolled, so
+        # the vectors enrolled since the gallery base was written are kept here until they are
+        # in a new base; the journal and compaction write these, not the index's decoded rows.
+        self._enrolled: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def load(cls, path: str, similarity_threshold: float = 0.35, index: Optional[VectorIndex] = None,
+             compact_every: int = 10000) -> "IdentityStore":
+        """Open a binary gallery; with the default FlatIndex the base matrix stays memory-mapped."""
+        gallery = GalleryFile(path)
+        ids, vectors = gallery.load_base()
+        if index is None:
+            index = FlatIndex.from_arrays(ids, vectors)
+        else:
+            index.extend(ids, vectors)
+        store = cls(similarity_threshold, index, gallery, compact_every)
+        for op, identity_id, vector in gallery.replay():
+            if op == OP_PUT:
+                store._put(identity_id, vector)
+            else:
+                store._drop(identity_id)
+        return store
+
+    def _lossy(self) -> bool:
+        return getattr(self.index, "lossy", False)
+
+    def _put(self, identity_id: str, vector: np.ndarray) -> np.ndarray:
+        vector = normalise(vector).reshape(-1)
+        self.index.add(identity_id, vector)
+        if self._lossy():
+            self._enrolled[identity_id] = vector
+        return vector
+
+    def _drop(self, identity_id: str) -> bool:
+        self._enrolled.pop(identity_id, None)
+        return self.index.remove(identity_id)
+
+    def _rows(self) -> np.ndarray:
+        # Full-precision rows in index.keys() order, for writing a gallery.
+        if not self._lossy():
+            return self.index.vectors
+        keys = self.index.keys()
+        rows = self.index.vectors
+        for i, key in enumerate(keys):
+            vector = self._enrolled.get(key)
+            if vector is not None:
+                rows[i] = vector
+        return rows
+
+    def save(self, path: str, dtype: str = "float32"):
+        if self.gallery is not None:
+            self.gallery.close()
+        self.gallery = GalleryFile.create(path, self.index.keys(), self._rows(), dtype)
+        if self._lossy():
+            self._rebase()
+
+    def compact(self):
+        if self.gallery is None:
+            return
+        self.gallery.compact(self.index.keys(), self._rows())
+        self._rebase()
+
+    def _rebase(self):
+        if type(self.index) is FlatIndex:
+            # Re-map the fresh base so rows enrolled since the last compaction leave the heap.
+            self.index = FlatIndex.from_arrays(*self.gallery.load_base())
+        elif isinstance(self.index, QuantizedIndex) and self.index.lossy:
+            self.index.attach(*self.gallery.load_base())
+            self._enrolled.clear()
+
+    def _journal(self, identity_id: str, vector: Optional[np.ndarray] = None):
+        if self.gallery is None:
+            return
+        if vector is None:
+            self.gallery.append_remove(identity_id)
+        else:
+            self.gallery.append_put(identity_id, vector)
+        if self.gallery.journal_records >= self.compact_every:
+            self.compact()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, identity_id: str) -> bool:
+        return identity_id in self.index
 
     def enroll(self, identity_id: str, embeddings: List[np.ndarray]) -> bool:
         if not embeddings:
             return False
-        self._identities[identity_id] = FaceEmbedding.average_embeddings(embeddings)
+        vector = self._put(identity_id, FaceEmbedding.average_embeddings(embeddings))
+        self._journal(identity_id, vector)
         return True
 
+    def get_embedding(self, identity_id: str) -> Optional[np.ndarray]:
+        vector = self._enrolled.get(identity_id)
+        return vector if vector is not None else self.index.get(identity_id)
+
     def verify(self, identity_id: str, embedding: np.ndarray, liveness_passed: bool) -> VerificationResult:
-        if identity_id not in self._identities:
+        if identity_id not in self.index:
             return VerificationResult(False, 0.0, self.similarity_threshold, liveness_passed,
                                       f"Identity '{identity_id}' not found")
-        similarity = FaceEmbedding.calculate_similarity(embedding, self._identities[identity_id])
+        similarity = FaceEmbedding.calculate_similarity(embedding, self.get_embedding(identity_id))
         verified = (similarity >= self.similarity_threshold) and liveness_passed
         return VerificationResult(verified, similarity, self.similarity_threshold, liveness_passed)
 
+    def _matches(self, keys: List[str], scores: np.ndarray) -> List[IdentificationMatch]:
+        matches = []
+        for identity_id, score in zip(keys, scores.tolist()):
+            similarity = float(np.clip(score, 0.0, 1.0))
+            matches.append(IdentificationMatch(identity_id, similarity, similarity >= self.similarity_threshold))
+        return matches
+
+    def identify(self, embedding: np.ndarray, top_k: int = 1) -> List[IdentificationMatch]:
+        return self._matches(*self.index.search(embedding, top_k))
+
+    def identify_batch(self, embeddings: np.ndarray, top_k: int = 1) -> List[List[IdentificationMatch]]:
+        return [self._matches(keys, scores) for keys, scores in self.index.search_batch(embeddings, top_k)]
+
     def get_identity_ids(self) -> List[str]:
-        return list(self._identities.keys())
+        return self.index.keys()
 
     def remove_identity(self, identity_id: str) -> bool:
-        if identity_id in self._identities:
-            del self._identities[identity_id]
-            return True
-        return False
+        if not self._drop(identity_id):
+            return False
+        self._journal(identity_id)
+        return True
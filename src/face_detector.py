@@ -1,8 +1,39 @@
 import cv2
 import numpy as np
-import mediapipe as mp
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
+
+
+# Serialized NormalizedLandmark record when exactly x, y and z are set:
+# landmark field tag + length, then tagged float32 x, y, z.
+_LANDMARK_RECORD = np.dtype([
+    ('tag', 'u1'), ('len', 'u1'),
+    ('x_tag', 'u1'), ('x', '<f4'),
+    ('y_tag', 'u1'), ('y', '<f4'),
+    ('z_tag', 'u1'), ('z', '<f4')
+])
+
+
+def landmarks_to_array(landmark_list, width: int, height: int) -> np.ndarray:
+    n = len(landmark_list.landmark)
+    out = np.empty((n, 2), dtype=np.float64)
+    buf = landmark_list.SerializeToString()
+    records = None
+    if len(buf) == n * _LANDMARK_RECORD.itemsize:
+        records = np.frombuffer(buf, dtype=_LANDMARK_RECORD)
+        tags_ok = ((records['tag'] == 0x0a) & (records['len'] == 15) & (records['x_tag'] == 0x0d)
+                   & (records['y_tag'] == 0x15) & (records['z_tag'] == 0x1d)).all()
+        if not tags_ok:
+            records = None
+
+    if records is not None:
+        out[:, 0] = records['x']
+        out[:, 1] = records['y']
+    else:
+        out.reshape(-1)[:] = np.fromiter(
+            (c for lm in landmark_list.landmark for c in (lm.x, lm.y)), dtype=np.float64, count=2 * n)
+    out *= (width, height)
+    return out
 
 
 @dataclass
@@ -33,16 +64,32 @@ class FaceDetector:
     LEFT_EYE_CORNER = 263
     RIGHT_EYE_CORNER = 33
 
-    def __init__(self, min_detection_confidence: float = 0.5, min_tracking_confidence: float = 0.5):
+    def __init__(self, min_detection_confidence: float = 0.5, min_tracking_confidence: float = 0.5,
+                 max_side: Optional[int] = None):
+        self.max_side = max_side
+        # mediapipe pulls in matplotlib and takes ~0.6 s to import, so it loads with the first detector.
+        import mediapipe as mp
         self.mp_face_mesh = mp.solutions.face_mesh
+        # Independent frames: face detector + landmarks on every call, no state between calls.
         self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
+            static_image_mode=True,
             max_num_faces=2,
             refine_landmarks=True,
+            min_detection_confidence=min_detection_confidence
+        )
+        # Frame sequences (see FaceTracker): landmarks only, on the region found in the previous
+        # frame. One face, otherwise MediaPipe keeps running the detector looking for a second.
+        self.tracking_mesh = self.mp_face_mesh.FaceMesh(
+            static_image_mode=False,
+            max_num_faces=1,
+            refine_landmarks=True,
             min_detection_confidence=min_detection_confidence,
             min_tracking_confidence=min_tracking_confidence
         )
 
+    def reset(self):
+        self.tracking_mesh.reset()
+
     def estimate_head_pose(self, landmarks: np.ndarray, frame_shape: Tuple[int, int]) -> HeadPose:
         h, w = frame_shape
         
@@ -74,12 +121,69 @@ class FaceDetector:
         else:
             direction = "center"
             
-        return HeadPose(yaw=yaw, pitch=pitch, direction=direction)
+        return HeadPose(yaw=float(yaw), pitch=float(pitch), direction=direction)
+
+    @staticmethod
+    def expand_roi(bbox: Tuple[int, int, int, int], margin: float = 0.5) -> Tuple[int, int, int, int]:
+        x, y, w, h = bbox
+        dx, dy = int(w * margin), int(h * margin)
+        return (max(0, x - dx), max(0, y - dy), w + 2 * dx, h + 2 * dy)
+
+    def detect(self, frame: np.ndarray, original_size: Optional[Tuple[int, int]] = None,
+               roi: Optional[Tuple[int, int, int, int]] = None, timings: Any = None) -> FaceDetectionResult:
+        """Detect on a possibly reduced frame; results are in original_size (width, height) coordinates.
+
+        roi is an (x, y, w, h) box in original coordinates to crop before inference, e.g. the
+        expanded bbox from the previous frame of a sequence. Falls back to the full frame if
+        no face is found inside it. timings, if given, receives 'mesh' and 'head_pose' stages
+        through its start()/stop(stage, start) methods.
+        """
+        frame, size = self._reduce(frame, original_size)
+        if roi is not None:
+            result = self._detect(frame, size, roi, timings)
+            if result.detected:
+                return result
+        return self._detect(frame, size, None, timings)
+
+    def track(self, frame: np.ndarray, original_size: Optional[Tuple[int, int]] = None,
+              timings: Any = None) -> FaceDetectionResult:
+        """Landmarks from the tracking mesh, which carries state from the previous call.
+
+        Use through FaceTracker, which checks the result against the previous frame. The
+        full frame is always used so the tracked region stays in the same coordinates.
+        """
+        frame, size = self._reduce(frame, original_size)
+        return self._detect(frame, size, None, timings, self.tracking_mesh, 'track')
+
+    def _reduce(self, frame: np.ndarray, original_size: Optional[Tuple[int, int]]) -> Tuple[np.ndarray, Tuple[int, int]]:
+        h, w = frame.shape[:2]
+        if self.max_side and max(h, w) > self.max_side:
+            f = self.max_side / max(h, w)
+            frame = cv2.resize(frame, (max(1, round(w * f)), max(1, round(h * f))), interpolation=cv2.INTER_AREA)
+        return frame, original_size or (w, h)
+
+    def _detect(self, frame: np.ndarray, original_size: Tuple[int, int],
+                roi: Optional[Tuple[int, int, int, int]], timings: Any = None,
+                mesh: Any = None, stage: str = 'mesh') -> FaceDetectionResult:
+        fh, fw = frame.shape[:2]
+        ow, oh = original_size
+        sx, sy = ow / fw, oh / fh
+
+        x0, y0 = 0, 0
+        if roi is not None:
+            rx, ry, rw, rh = roi
+            x0, y0 = max(0, int(rx / sx)), max(0, int(ry / sy))
+            x1, y1 = min(fw, int((rx + rw) / sx) + 1), min(fh, int((ry + rh) / sy) + 1)
+            if x1 - x0 < 2 or y1 - y0 < 2:
+                return FaceDetectionResult(detected=False, face_count=0, error_message="Empty ROI")
+            frame = frame[y0:y1, x0:x1]
 
-    def detect(self, frame: np.ndarray) -> FaceDetectionResult:
         rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         h, w = frame.shape[:2]
-        results = self.face_mesh.process(rgb)
+        start = timings.start() if timings is not None else 0.0
+        results = (mesh or self.face_mesh).process(rgb)
+        if timings is not None:
+            timings.stop(stage, start)
 
         if not results.multi_face_landmarks:
             return FaceDetectionResult(detected=False, face_count=0, error_message="No face detected")
@@ -90,7 +194,9 @@ class FaceDetector:
                                        error_message=f"Multiple faces detected ({face_count})")
 
         face_landmarks = results.multi_face_landmarks[0]
-        landmarks = np.array([[lm.x * w, lm.y * h] for lm in face_landmarks.landmark])
+        landmarks = landmarks_to_array(face_landmarks, w, h)
+        landmarks += (x0, y0)
+        landmarks *= (sx, sy)
 
         left_eye = landmarks[self.LEFT_EYE_IDX]
         right_eye = landmarks[self.RIGHT_EYE_IDX]
@@ -100,7 +206,10 @@ class FaceDetector:
         pad = 20
         bbox = (max(0, x_min - pad), max(0, y_min - pad), x_max - x_min + 2 * pad, y_max - y_min + 2 * pad)
         
-        head_pose = self.estimate_head_pose(landmarks, (h, w))
+        start = timings.start() if timings is not None else 0.0
+        head_pose = self.estimate_head_pose(landmarks, (oh, ow))
+        if timings is not None:
+            timings.stop('head_pose', start)
 
         return FaceDetectionResult(
             detected=True, bbox=bbox, landmarks=landmarks,
@@ -126,3 +235,67 @@ class FaceDetector:
                 cv2.circle(output, (int(pt[0]), int(pt[1])), 2, (0, 0, 255), -1)
 
         return output
+
+
+def bbox_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FaceTracker:
+    """Landmarks for one ordered frame sequence, e.g. a blink burst.
+
+    The first frame gets a full detection. Later frames run only the landmark model on the
+    region MediaPipe derived from the previous frame, and are accepted when their bbox
+    overlaps the previous face by at least min_iou. Anything else (tracking lost, a gap or
+    out-of-order frame, tracker state left over from another sequence) falls back to a full
+    detection of that frame, cropped to the previous face first when roi_margin is set.
+
+    Tracked frames look for one face only; the first frame and every re-detection still
+    reject frames with more than one face.
+    """
+
+    def __init__(self, detector: FaceDetector, min_iou: float = 0.5, roi_margin: Optional[float] = 0.5):
+        self.detector = detector
+        self.min_iou = min_iou
+        self.roi_margin = roi_margin
+        self._previous: Optional[FaceDetectionResult] = None
+        self.detections = 0
+        self.tracked = 0
+        self.redetections = 0
+
+    def reset(self):
+        self._previous = None
+
+    def track(self, frame: np.ndarray, original_size: Optional[Tuple[int, int]] = None,
+              roi: Optional[Tuple[int, int, int, int]] = None, timings: Any = None) -> FaceDetectionResult:
+        # roi is accepted for drop-in use where FaceDetector.detect is expected; the tracker
+        # picks its own region.
+        previous = self._previous
+        if previous is not None:
+            result = self.detector.track(frame, original_size, timings)
+            if result.detected and bbox_iou(result.bbox, previous.bbox) >= self.min_iou:
+                self.tracked += 1
+                if timings is not None:
+                    timings.count('frames_tracked')
+                self._previous = result
+                return result
+            self.redetections += 1
+            if timings is not None:
+                timings.count('tracking_lost')
+            if result.detected:
+                # Locked onto something else; make the next tracked frame start over.
+                self.detector.reset()
+
+        roi = None
+        if previous is not None and self.roi_margin is not None:
+            roi = FaceDetector.expand_roi(previous.bbox, self.roi_margin)
+        result = self.detector.detect(frame, original_size, roi, timings)
+        self.detections += 1
+        self._previous = result if result.detected else None
+        return result
@@ -0,0 +1,233 @@
+"""Binary on-disk identity gallery.
+
+Layout of a gallery directory:
+
+    meta.json            {"version", "generation", "dim", "dtype", "count"}
+    vectors-<gen>.npy    (count, dim) float32/float16 unit vectors, opened with np.memmap
+    ids-<gen>.txt        one identity id per line, row order of vectors-<gen>.npy
+    journal-<gen>.bin    append-only enroll/remove records since the base was written
+
+Compaction writes a new generation and then swaps meta.json, so a crash at any
+point leaves either the old or the new generation intact.
+
+Convert an existing JSON gallery (``{"id": [512 floats], ...}`` or JSON lines):
+
+    python -m src.gallery convert users.json gallery/ --dtype float16
+"""
+import argparse
+import json
+import os
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+OP_PUT = 1
+OP_REMOVE = 2
+_RECORD = struct.Struct('>BH')
+FORMAT_VERSION = 1
+
+
+class GalleryFile:
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported gallery version {self.meta.get('version')}")
+        self.dim = int(self.meta["dim"])
+        self.dtype = np.dtype(self.meta["dtype"])
+        self.generation = int(self.meta["generation"])
+        self.journal_records = 0
+        # Byte length of the intact journal prefix, set once replay() has read to the end.
+        self.journal_end: Optional[int] = None
+        self._journal = None
+
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        gen = self.generation if generation is None else generation
+        stem, ext = os.path.splitext(name)
+        return os.path.join(self.path, f"{stem}-{gen}{ext}")
+
+    @classmethod
+    def create(cls, path: str, ids: List[str], vectors: np.ndarray, dtype: str = "float32") -> "GalleryFile":
+        os.makedirs(path, exist_ok=True)
+        vectors = np.asarray(vectors)
+        meta = {"version": FORMAT_VERSION, "generation": 0, "dim": int(vectors.shape[1]),
+                "dtype": np.dtype(dtype).name, "count": len(ids)}
+        meta_path = os.path.join(path, "meta.json")
+        previous = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                previous = json.load(f)["generation"]
+            meta["generation"] = previous + 1
+        _write_generation(path, meta, ids, vectors)
+        if previous is not None:
+            _remove_generation(path, previous)
+        return cls(path)
+
+    def load_base(self) -> Tuple[List[str], np.ndarray]:
+        with open(self._file("ids.txt"), encoding="utf-8") as f:
+            ids = f.read().split("\n")[:int(self.meta["count"])]
+        if not ids:
+            return [], np.empty((0, self.dim), dtype=self.dtype)
+        # Copy-on-write map: pages are read lazily and in-place edits never reach the file.
+        vectors = np.load(self._file("vectors.npy"), mmap_mode="c")
+        return ids, vectors
+
+    def replay(self) -> Iterator[Tuple[int, str, Optional[np.ndarray]]]:
+        path = self._file("journal.bin")
+        if not os.path.exists(path):
+            self.journal_end = 0
+            return
+        row_bytes = self.dim * self.dtype.itemsize
+        with open(path, "rb") as f:
+            data = f.read()
+        pos = 0
+        count = 0
+        while pos + _RECORD.size <= len(data):
+            op, id_len = _RECORD.unpack_from(data, pos)
+            end = pos + _RECORD.size + id_len + (row_bytes if op == OP_PUT else 0)
+            if end > len(data):
+                break  # torn write at the tail; everything before it is intact
+            identity_id = data[pos + _RECORD.size:pos + _RECORD.size + id_len].decode("utf-8")
+            vector = None
+            if op == OP_PUT:
+                vector = np.frombuffer(data, dtype=self.dtype, count=self.dim, offset=end - row_bytes)
+            pos = end
+            count += 1
+            yield op, identity_id, vector
+        self.journal_records = count
+        self.journal_end = pos
+
+    def _append(self, op: int, identity_id: str, vector: Optional[np.ndarray]):
+        if self._journal is None:
+            if self.journal_end is None:
+                for _ in self.replay():
+                    pass
+            self._journal = open(self._file("journal.bin"), "ab")
+            # Drop a torn tail record, otherwise it would swallow the bytes appended after it.
+            self._journal.truncate(self.journal_end)
+        encoded = identity_id.encode("utf-8")
+        record = _RECORD.pack(op, len(encoded)) + encoded
+        if vector is not None:
+            record += np.asarray(vector, dtype=self.dtype).reshape(self.dim).tobytes()
+        self._journal.write(record)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self.journal_records += 1
+        self.journal_end += len(record)
+
+    def append_put(self, identity_id: str, vector: np.ndarray):
+        _check_id(identity_id)
+        self._append(OP_PUT, identity_id, vector)
+
+    def append_remove(self, identity_id: str):
+        self._append(OP_REMOVE, identity_id, None)
+
+    def compact(self, ids: List[str], vectors: np.ndarray):
+        old_generation = self.generation
+        self.close()
+        meta = dict(self.meta, generation=old_generation + 1, count=len(ids))
+        _write_generation(self.path, meta, ids, vectors)
+        self.meta = meta
+        self.generation = meta["generation"]
+        self.journal_records = 0
+        self.journal_end = 0
+        _remove_generation(self.path, old_generation)
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+def _check_id(identity_id: str):
+    if "\n" in identity_id or len(identity_id.encode("utf-8")) > 0xFFFF:
+        raise ValueError(f"Invalid identity id {identity_id!r}")
+
+
+def _write_generation(path: str, meta: Dict[str, Any], ids: List[str], vectors: np.ndarray):
+    gen = meta["generation"]
+    for identity_id in ids:
+        _check_id(identity_id)
+    out = np.lib.format.open_memmap(os.path.join(path, f"vectors-{gen}.npy"), mode="w+",
+                                    dtype=meta["dtype"], shape=(max(len(ids), 1), meta["dim"]))
+    for start in range(0, len(ids), 65536):
+        out[start:start + 65536] = vectors[start:start + 65536]
+    out.flush()
+    del out
+    _fsync(os.path.join(path, f"vectors-{gen}.npy"))
+    with open(os.path.join(path, f"ids-{gen}.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(ids))
+        f.flush()
+        os.fsync(f.fileno())
+    with open(os.path.join(path, f"journal-{gen}.bin"), "wb") as f:
+        os.fsync(f.fileno())
+    # Everything the new meta.json points at is on disk before it replaces the old one.
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, "meta.json"))
+    _fsync(path)
+
+
+def _fsync(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _remove_generation(path: str, generation: int):
+    for name in ("vectors-{}.npy", "ids-{}.txt", "journal-{}.bin"):
+        try:
+            os.remove(os.path.join(path, name.format(generation)))
+        except FileNotFoundError:
+            pass
+
+
+def read_json_gallery(path: str) -> Tuple[List[str], np.ndarray]:
+    entries: Dict[str, List[float]] = {}
+
+    def take(obj: Dict[str, Any]):
+        if "id" in obj and "embedding" in obj:
+            entries[str(obj["id"])] = obj["embedding"]
+            return
+        for key, value in obj.items():
+            if isinstance(value, list):
+                entries[str(key)] = value
+
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    take(json.loads(line))
+        else:
+            data = json.load(f)
+            for obj in (data if isinstance(data, list) else [data]):
+                take(obj)
+    ids = list(entries)
+    vectors = np.asarray([entries[i] for i in ids], dtype=np.float32).reshape(len(ids), -1)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10
+    return ids, vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Identity gallery tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="convert a JSON/JSONL gallery to the binary format")
+    convert.add_argument("source")
+    convert.add_argument("target")
+    convert.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+
+    ids, vectors = read_json_gallery(args.source)
+    GalleryFile.create(args.target, ids, vectors, args.dtype)
+    print(f"Wrote {len(ids)} identities ({vectors.shape[1]}-d, {args.dtype}) to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+from typing import Any, Optional, Tuple
+
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+# SOF markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) share the range but do not.
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(data: Any) -> Optional[Tuple[int, int]]:
+    """Return (width, height) from a JPEG header without decoding, or None if not a JPEG."""
+    buf = memoryview(data).cast('B')
+    if len(buf) < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+    pos = 2
+    while pos + 4 <= len(buf):
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in (0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7):
+            pos += 2
+            continue
+        length = (buf[pos + 2] << 8) | buf[pos + 3]
+        if marker in _SOF_MARKERS:
+            if pos + 9 > len(buf):
+                return None
+            height = (buf[pos + 5] << 8) | buf[pos + 6]
+            width = (buf[pos + 7] << 8) | buf[pos + 8]
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def image_size(data: Any) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG or PNG header without decoding, or None for other formats."""
+    buf = memoryview(data).cast('B')
+    if len(buf) >= 24 and bytes(buf[:8]) == b'\x89PNG\r\n\x1a\n':
+        width = int.from_bytes(buf[16:20], 'big')
+        height = int.from_bytes(buf[20:24], 'big')
+        return width, height
+    return jpeg_size(buf)
+
+
+def decode_image(data: Any, max_side: Optional[int] = None) -> Optional[Tuple[np.ndarray, Tuple[int, int]]]:
+    """Decode image bytes, using libjpeg's reduced-size decode when the result still covers max_side.
+
+    Returns the decoded BGR frame and the (width, height) of the full-resolution image,
+    so coordinates found on the reduced frame can be mapped back.
+    """
+    nparr = np.frombuffer(data, np.uint8)
+    size = jpeg_size(nparr) if max_side else None
+    if size is not None:
+        w, h = size
+        for factor, flag in _REDUCED_FLAGS:
+            if max(w, h) // factor < max_side:
+                continue
+            img = cv2.imdecode(nparr, flag)
+            if img is None:
+                break
+            dh, dw = img.shape[:2]
+            rw, rh = -(-w // factor), -(-h // factor)
+            if (dw, dh) == (rw, rh):
+                return img, (w, h)
+            if (dw, dh) == (rh, rw):
+                # EXIF orientation rotated the image by 90 degrees.
+                return img, (h, w)
+            return img, (dw * factor, dh * factor)
+
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    return img, (img.shape[1], img.shape[0])
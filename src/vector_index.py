@@ -0,0 +1,593 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+def normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / (np.linalg.norm(vectors, axis=-1, keepdims=True) + 1e-10)
+
+
+def is_mapped(array: np.ndarray) -> bool:
+    # True for a memory-mapped file (np.load(..., mmap_mode=...)) or a view of one.
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k] if k < scores.shape[0] else np.arange(scores.shape[0])
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class VectorIndex:
+    """Cosine-similarity index over unit vectors keyed by identity id."""
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def add(self, key: str, vector: np.ndarray):
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def remove(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def keys(self) -> List[str]:
+        raise NotImplementedError
+
+    @property
+    def vectors(self) -> np.ndarray:
+        # Rows in the same order as keys().
+        raise NotImplementedError
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        raise NotImplementedError
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Tuple[List[str], np.ndarray]]:
+        return [self.search(q, k) for q in queries]
+
+    def extend(self, keys: List[str], matrix: np.ndarray):
+        for key, vector in zip(keys, matrix):
+            self.add(key, vector)
+
+
+class FlatIndex(VectorIndex):
+    """Exact scan over contiguous float32 rows; O(1) amortised add and swap-delete remove.
+
+    Rows live in two segments: an optional base matrix (e.g. a copy-on-write memmap of a
+    saved gallery, see from_arrays) followed by an in-memory tail that takes new rows, so
+    opening a large gallery neither copies it nor grows RSS until rows are written. A
+    float16 base is kept as float16 and widened to float32 one chunk at a time while scoring.
+    """
+
+    _CHUNK = 4096
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024):
+        self.dim = dim
+        self._initial_capacity = max(1, initial_capacity)
+        self._base: Optional[np.ndarray] = None
+        self._base_len = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    @classmethod
+    def from_arrays(cls, keys: List[str], matrix: np.ndarray, initial_capacity: int = 1024) -> "FlatIndex":
+        # matrix rows must already be unit length; float32 and float16 are used as-is, not copied.
+        if matrix.dtype not in (np.float32, np.float16):
+            matrix = matrix.astype(np.float32)
+        index = cls(dim=matrix.shape[1], initial_capacity=initial_capacity)
+        index._base = matrix
+        index._base_len = len(keys)
+        index._keys = list(keys)
+        index._rows = {key: row for row, key in enumerate(index._keys)}
+        if len(index._rows) != len(index._keys):
+            raise ValueError("Duplicate keys in index base")
+        return index
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def _segments(self) -> List[np.ndarray]:
+        segments = []
+        if self._base_len:
+            segments.append(self._base[:self._base_len])
+        tail = len(self._keys) - self._base_len
+        if tail:
+            segments.append(self._matrix[:tail])
+        return segments
+
+    @property
+    def vectors(self) -> np.ndarray:
+        segments = self._segments()
+        if not segments:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        if len(segments) == 1:
+            return segments[0].astype(np.float32, copy=False)
+        return np.concatenate(segments).astype(np.float32, copy=False)
+
+    def _slot(self, row: int) -> Tuple[np.ndarray, int]:
+        if row < self._base_len:
+            return self._base, row
+        return self._matrix, row - self._base_len
+
+    def _reserve(self, rows: int):
+        tail = len(self._keys) - self._base_len
+        if self._matrix is None:
+            self._matrix = np.zeros((max(self._initial_capacity, rows), self.dim), dtype=np.float32)
+        elif rows > self._matrix.shape[0]:
+            grown = np.zeros((max(rows, self._matrix.shape[0] * 2), self.dim), dtype=np.float32)
+            grown[:tail] = self._matrix[:tail]
+            self._matrix = grown
+
+    def add(self, key: str, vector: np.ndarray) -> int:
+        vector = normalise(vector).reshape(-1)
+        if self.dim is None:
+            self.dim = vector.shape[0]
+        elif vector.shape[0] != self.dim:
+            raise ValueError(f"Vector has {vector.shape[0]} dims, index expects {self.dim}")
+
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            self._reserve(row - self._base_len + 1)
+            self._keys.append(key)
+            self._rows[key] = row
+        array, pos = self._slot(row)
+        array[pos] = vector
+        return row
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        array, pos = self._slot(row)
+        return array[pos].astype(np.float32, copy=False)
+
+    def remove(self, key: str) -> bool:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        # Swap-delete: move the last row into the hole so the segments stay dense.
+        last = len(self._keys) - 1
+        if row != last:
+            moved = self._keys[last]
+            dst, dst_pos = self._slot(row)
+            src, src_pos = self._slot(last)
+            dst[dst_pos] = src[src_pos]
+            self._keys[row] = moved
+            self._rows[moved] = row
+        self._keys.pop()
+        if last < self._base_len:
+            self._base_len -= 1
+        return True
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        # queries: (d,) or (m, d) -> scores over every row, segment by segment.
+        parts = []
+        for segment in self._segments():
+            if segment.dtype == np.float32:
+                parts.append(queries @ segment.T)
+                continue
+            for start in range(0, len(segment), self._CHUNK):
+                parts.append(queries @ segment[start:start + self._CHUNK].astype(np.float32).T)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=-1)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        if not self._keys:
+            return [], np.empty(0, dtype=np.float32)
+        scores = self._scores(normalise(query).reshape(-1))
+        idx = top_k(scores, k)
+        return [self._keys[i] for i in idx], scores[idx]
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Tuple[List[str], np.ndarray]]:
+        queries = normalise(queries)
+        if not self._keys:
+            return [([], np.empty(0, dtype=np.float32)) for _ in range(len(queries))]
+        results = []
+        for scores in self._scores(queries):
+            idx = top_k(scores, k)
+            results.append(([self._keys[i] for i in idx], scores[idx]))
+        return results
+
+
+class _InvertedList:
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((16, dim), dtype=np.float32)
+        self.keys: List[str] = []
+
+    def append(self, key: str, vector: np.ndarray) -> int:
+        pos = len(self.keys)
+        if pos == self.vectors.shape[0]:
+            grown = np.zeros((pos * 2, self.vectors.shape[1]), dtype=np.float32)
+            grown[:pos] = self.vectors
+            self.vectors = grown
+        self.vectors[pos] = vector
+        self.keys.append(key)
+        return pos
+
+    def swap_delete(self, pos: int) -> Optional[str]:
+        last = len(self.keys) - 1
+        moved = None
+        if pos != last:
+            moved = self.keys[last]
+            self.vectors[pos] = self.vectors[last]
+            self.keys[pos] = moved
+        self.keys.pop()
+        return moved
+
+
+class IVFIndex(VectorIndex):
+    """Inverted-file ANN index: spherical k-means coarse quantiser with nprobe lists scanned per query.
+
+    Until min_train_size vectors have been added it answers with an exact scan. Training moves
+    every row into the inverted lists, which then hold the only copy; inserts go straight to
+    the nearest list. Call train() again after large gallery changes to rebalance. Raising
+    nprobe trades latency for recall (nprobe == nlist is exact).
+    """
+
+    def __init__(self, nlist: int = 1024, nprobe: int = 16, min_train_size: Optional[int] = None,
+                 kmeans_iters: int = 10, train_sample: int = 100_000, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = nlist * 39 if min_train_size is None else min_train_size
+        self.kmeans_iters = kmeans_iters
+        self.train_sample = train_sample
+        self.dim: Optional[int] = None
+        self._rng = np.random.default_rng(seed)
+        # Rows before training; None once they live in the inverted lists.
+        self._store: Optional[FlatIndex] = FlatIndex()
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[_InvertedList] = []
+        self._location: Dict[str, Tuple[int, int]] = {}
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def __len__(self) -> int:
+        return len(self._store) if self._store is not None else len(self._location)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._store if self._store is not None else key in self._location
+
+    def keys(self) -> List[str]:
+        if self._store is not None:
+            return self._store.keys()
+        return [key for inv in self._lists for key in inv.keys]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._store is not None:
+            return self._store.vectors
+        parts = [inv.vectors[:len(inv.keys)] for inv in self._lists if inv.keys]
+        if not parts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.concatenate(parts)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        if self._store is not None:
+            return self._store.get(key)
+        location = self._location.get(key)
+        if location is None:
+            return None
+        c, pos = location
+        return self._lists[c].vectors[pos]
+
+    def _kmeans(self, data: np.ndarray, k: int) -> np.ndarray:
+        centroids = data[self._rng.choice(len(data), size=k, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            counts = np.bincount(assign, minlength=k)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty clusters from random points so every list stays useful.
+                sums[empty] = data[self._rng.choice(len(data), size=int(empty.sum()), replace=False)]
+            centroids = normalise(sums)
+        return centroids
+
+    def train(self):
+        keys, vectors = self.keys(), self.vectors
+        if len(vectors) < self.nlist:
+            return
+        sample = vectors
+        if len(vectors) > self.train_sample:
+            sample = vectors[self._rng.choice(len(vectors), size=self.train_sample, replace=False)]
+        self._centroids = self._kmeans(sample, self.nlist)
+        self._lists = [_InvertedList(self.dim) for _ in range(self.nlist)]
+        self._location = {}
+        for start in range(0, len(vectors), 65536):
+            chunk = vectors[start:start + 65536]
+            assign = np.argmax(chunk @ self._centroids.T, axis=1)
+            for key, vector, c in zip(keys[start:start + 65536], chunk, assign):
+                self._location[key] = (int(c), self._lists[c].append(key, vector))
+        self._store = None
+
+    def _unlink(self, key: str) -> bool:
+        location = self._location.pop(key, None)
+        if location is None:
+            return False
+        c, pos = location
+        moved = self._lists[c].swap_delete(pos)
+        if moved is not None:
+            self._location[moved] = (c, pos)
+        return True
+
+    def add(self, key: str, vector: np.ndarray):
+        if not self.trained:
+            self._store.add(key, vector)
+            self.dim = self._store.dim
+            if len(self._store) >= self.min_train_size:
+                self.train()
+            return
+        vector = normalise(vector).reshape(-1)
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Vector has {vector.shape[0]} dims, index expects {self.dim}")
+        self._unlink(key)
+        c = int(np.argmax(self._centroids @ vector))
+        self._location[key] = (c, self._lists[c].append(key, vector))
+
+    def remove(self, key: str) -> bool:
+        if not self.trained:
+            return self._store.remove(key)
+        return self._unlink(key)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        if not self.trained:
+            return self._store.search(query, k)
+        query = normalise(query).reshape(-1)
+        probes = top_k(self._centroids @ query, self.nprobe)
+        keys: List[str] = []
+        scores = []
+        for c in probes:
+            inv = self._lists[c]
+            if inv.keys:
+                scores.append(inv.vectors[:len(inv.keys)] @ query)
+                keys.extend(inv.keys)
+        if not keys:
+            return [], np.empty(0, dtype=np.float32)
+        scores = np.concatenate(scores)
+        idx = top_k(scores, k)
+        return [keys[i] for i in idx], scores[idx]
+
+
+class QuantizedIndex(VectorIndex):
+    """Exact scan over compact codes with a full-precision re-ranking stage.
+
+    dtype="int8" stores each row as int8 codes plus a float32 scale (max|x| / 127), a 4x
+    saving; dtype="float16" halves memory. The scan decodes rows in chunks, picks the best
+    max(k, rerank) candidates and re-scores them against full-precision rows, so returned
+    similarities are exact, wherever such rows exist without a heap copy: when the index is
+    built by extend from a memory-mapped gallery (IdentityStore.load), candidates from it are
+    re-scored against the mapped rows, which only page in for the few candidates read. Rows
+    added later have no full-precision copy and keep their approximate score. keep_full=True
+    keeps a float32 copy of every row instead (shared if extend is given a float32 matrix),
+    which costs more memory than the codes save unless that matrix is mapped.
+
+    Without re-ranking, similarity error on 512-d unit vectors stays below 2e-3 (int8) and
+    1e-4 (float16); see benchmarks/quantised_recall.py. int8 scans at float32 speed; numpy has
+    no fast float16 widening, so float16 trades scan time for the smaller footprint.
+    """
+
+    CODE_DTYPES = ("int8", "float16")
+    _CHUNK = 1024
+
+    def __init__(self, dtype: str = "int8", rerank: int = 32, keep_full: bool = False,
+                 initial_capacity: int = 1024):
+        if dtype not in self.CODE_DTYPES:
+            raise ValueError(f"Unknown code dtype '{dtype}', expected one of {self.CODE_DTYPES}")
+        self.dtype = np.dtype(dtype)
+        self.rerank = rerank
+        self.dim: Optional[int] = None
+        self._initial_capacity = max(1, initial_capacity)
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._full: Optional[FlatIndex] = FlatIndex() if keep_full else None
+        # Memory-mapped base rows given to extend, for re-ranking and get; key -> row.
+        self._mapped: Optional[np.ndarray] = None
+        self._mapped_rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = normalise(vectors)
+        if self.dtype == np.float16:
+            return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0 + 1e-12
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def decode(self, start: int, stop: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            out = np.empty((stop - start, self.dim), dtype=np.float32)
+        np.copyto(out, self._codes[start:stop], casting="unsafe")
+        if self.dtype == np.int8:
+            out *= self._scales[start:stop, None]
+        return out
+
+    @property
+    def lossy(self) -> bool:
+        # Whether get/vectors may return decoded approximations rather than the rows added.
+        return self._full is None
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._full is not None:
+            return np.stack([self._full.get(key) for key in self._keys]) if self._keys \
+                else np.empty((0, self.dim or 0), dtype=np.float32)
+        out = self.decode(0, len(self._keys))
+        if self._mapped_rows:
+            pos, rows = self._mapped_positions(self._keys)
+            if pos:
+                out[pos] = self._mapped[rows]
+        return out
+
+    def attach(self, keys: List[str], matrix: np.ndarray):
+        """Re-rank and get against matrix (e.g. a freshly compacted gallery base) for keys.
+
+        The rows must hold the vectors these keys were added with."""
+        self._mapped = matrix
+        self._mapped_rows = {key: row for row, key in enumerate(keys) if key in self._rows}
+
+    def _mapped_positions(self, keys: List[str]) -> Tuple[List[int], List[int]]:
+        pos, rows = [], []
+        for i, key in enumerate(keys):
+            row = self._mapped_rows.get(key)
+            if row is not None:
+                pos.append(i)
+                rows.append(row)
+        return pos, rows
+
+    def _reserve(self, rows: int):
+        if self._codes is None:
+            capacity = max(self._initial_capacity, rows)
+        elif rows > self._codes.shape[0]:
+            capacity = max(rows, self._codes.shape[0] * 2)
+        else:
+            return
+        codes = np.zeros((capacity, self.dim), dtype=self.dtype)
+        scales = np.zeros(capacity, dtype=np.float32)
+        if self._codes is not None:
+            codes[:len(self._keys)] = self._codes[:len(self._keys)]
+            scales[:len(self._keys)] = self._scales[:len(self._keys)]
+        self._codes, self._scales = codes, scales
+
+    def extend(self, keys: List[str], matrix: np.ndarray):
+        if len(matrix) == 0:
+            return
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"Vectors have {matrix.shape[1]} dims, index expects {self.dim}")
+        if self._full is not None:
+            if len(self._full) == 0 and matrix.dtype == np.float32:
+                # Share the caller's rows (e.g. a gallery memmap) instead of copying them.
+                self._full = FlatIndex.from_arrays(keys, matrix)
+            else:
+                self._full.extend(keys, matrix)
+        elif self._mapped is None and not self._keys and is_mapped(matrix):
+            self._mapped = matrix
+            self._mapped_rows = {key: row for row, key in enumerate(keys)}
+        for start in range(0, len(keys), 65536):
+            chunk = keys[start:start + 65536]
+            codes, scales = self.encode(matrix[start:start + 65536])
+            for key, code, scale in zip(chunk, codes, scales):
+                self._put(key, code, scale)
+
+    def _put(self, key: str, code: np.ndarray, scale: float):
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            self._reserve(row + 1)
+            self._keys.append(key)
+            self._rows[key] = row
+        self._codes[row] = code
+        self._scales[row] = scale
+
+    def add(self, key: str, vector: np.ndarray):
+        vector = normalise(vector).reshape(1, -1)
+        if self.dim is None:
+            self.dim = vector.shape[1]
+        elif vector.shape[1] != self.dim:
+            raise ValueError(f"Vector has {vector.shape[1]} dims, index expects {self.dim}")
+        if self._full is not None:
+            self._full.add(key, vector[0])
+        self._mapped_rows.pop(key, None)
+        codes, scales = self.encode(vector)
+        self._put(key, codes[0], scales[0])
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        if self._full is not None:
+            return self._full.get(key)
+        mapped = self._mapped_rows.get(key)
+        if mapped is not None:
+            return np.asarray(self._mapped[mapped], dtype=np.float32)
+        return self.decode(row, row + 1)[0]
+
+    def remove(self, key: str) -> bool:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        last = len(self._keys) - 1
+        if row != last:
+            moved = self._keys[last]
+            self._codes[row] = self._codes[last]
+            self._scales[row] = self._scales[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+        self._keys.pop()
+        if self._full is not None:
+            self._full.remove(key)
+        self._mapped_rows.pop(key, None)
+        return True
+
+    def _scan(self, queries: np.ndarray) -> np.ndarray:
+        # queries: (m, d) -> (m, n) approximate scores, decoding one chunk of codes at a time.
+        n = len(self._keys)
+        # Filled row-major as (n, m) so each chunk's output block is contiguous for np.dot.
+        scores = np.empty((n, len(queries)), dtype=np.float32)
+        buffer = np.empty((min(self._CHUNK, n), self.dim), dtype=np.float32)
+        for start in range(0, n, self._CHUNK):
+            stop = min(start + self._CHUNK, n)
+            chunk = buffer[:stop - start]
+            np.copyto(chunk, self._codes[start:stop], casting="unsafe")
+            np.dot(chunk, queries.T, out=scores[start:stop])
+        if self.dtype == np.int8:
+            # Per-row scales commute with the dot product, so apply them once to the scores.
+            scores *= self._scales[:n, None]
+        return scores.T
+
+    def _rank(self, query: np.ndarray, scores: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        if self._full is None and not self._mapped_rows:
+            idx = top_k(scores, k)
+            return [self._keys[i] for i in idx], scores[idx]
+        shortlist = top_k(scores, max(k, self.rerank))
+        candidates = [self._keys[i] for i in shortlist]
+        if self._full is not None:
+            exact = np.stack([self._full.get(key) for key in candidates]) @ query
+        else:
+            exact = scores[shortlist]
+            pos, rows = self._mapped_positions(candidates)
+            if pos:
+                exact[pos] = np.asarray(self._mapped[rows], dtype=np.float32) @ query
+        idx = top_k(exact, k)
+        return [candidates[i] for i in idx], exact[idx]
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        return self.search_batch(np.asarray(query).reshape(1, -1), k)[0]
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Tuple[List[str], np.ndarray]]:
+        queries = normalise(queries)
+        if not self._keys:
+            return [([], np.empty(0, dtype=np.float32)) for _ in range(len(queries))]
+        return [self._rank(query, scores, k) for query, scores in zip(queries, self._scan(queries))]
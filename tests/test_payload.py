@@ -0,0 +1,88 @@
+import base64
+import json
+
+import pytest
+
+from api.payload import JsonFrameParser, PayloadLimits, PayloadTooLarge
+
+FRAME = bytes(range(256)) * 3
+FRAME_B64 = base64.b64encode(FRAME).decode()
+
+
+def parse(body: bytes, chunk_size: int, limits: PayloadLimits = None):
+    parser = JsonFrameParser(limits or PayloadLimits())
+    for start in range(0, len(body), chunk_size):
+        parser.feed(body[start:start + chunk_size])
+    return parser.close()
+
+
+def body_with(frame_text: str) -> bytes:
+    # frame_text is spliced in as raw JSON string content, escapes and all.
+    return ('{"frames": {"center": "' + frame_text + '", "blink": ["' + frame_text + '"]}, '
+            '"options": {"note": "a\\"b\\u00e9", "n": [1, -2.5e3, true, false, null]}}').encode()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64, 1 << 20])
+@pytest.mark.parametrize("frame_text", [
+    FRAME_B64,
+    FRAME_B64.replace("/", "\\/"),
+    FRAME_B64.replace("/", "\\u002F").replace("+", "\\u002b"),
+    "\\u0041" + FRAME_B64[1:],
+    "\\n".join(FRAME_B64[i:i + 76] for i in range(0, len(FRAME_B64), 76)),
+    FRAME_B64[:10] + "\\t\\r\\b\\f" + FRAME_B64[10:],
+])
+def test_frames_decode_like_json_loads(frame_text, chunk_size):
+    body = body_with(frame_text)
+    expected = json.loads(body)
+    expected["frames"]["center"] = base64.b64decode(expected["frames"]["center"])
+    expected["frames"]["blink"] = [base64.b64decode(expected["frames"]["blink"][0])]
+    assert parse(body, chunk_size) == expected
+    assert expected["frames"]["center"] == FRAME
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1 << 20])
+def test_escaped_backslash_and_quote_in_frame(chunk_size):
+    # Both decode to characters base64.b64decode skips, so the frame still decodes.
+    text = FRAME_B64[:8] + "\\\\" + FRAME_B64[8:16] + '\\"' + FRAME_B64[16:]
+    assert parse(body_with(text), chunk_size)["frames"]["center"] == FRAME
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1 << 20])
+def test_non_ascii_escape_makes_frame_invalid(chunk_size):
+    # json.loads accepts it; base64.b64decode then rejects the non-ASCII text.
+    result = parse(body_with("\\u00e9" + FRAME_B64), chunk_size)
+    assert result["frames"]["center"] == b""
+
+
+@pytest.mark.parametrize("frame_text", [FRAME_B64[:-1], FRAME_B64[:4] + "!!" + FRAME_B64[4:-2]])
+def test_bad_base64_yields_empty_frame(frame_text):
+    assert parse(body_with(frame_text), 1 << 20)["frames"]["center"] == b""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1 << 20])
+@pytest.mark.parametrize("body", [
+    b'{"frames": {"center": "AAAA\\x"}}',
+    b'{"frames": {"center": "AA\\u00G1AA"}}',
+    b'{"frames": {"center": "AAAA\\u00"}}',
+    b'{"frames": {"center": "AAAA"',
+    b'{"frames": {"center": "AAAA"}',
+    b'{"frames": {"center" "AAAA"}}',
+    b'{"frames": {"center": "AAAA",}}',
+    b'{"frames": ["AAAA"}',
+    b'{"frames": {}} {}',
+    b'{frames: {}}',
+    b'',
+])
+def test_malformed_json_raises_value_error(body, chunk_size):
+    with pytest.raises(ValueError):
+        parse(body, chunk_size)
+
+
+def test_frame_limits():
+    limits = PayloadLimits(max_frame_bytes=len(FRAME) - 1)
+    with pytest.raises(PayloadTooLarge):
+        parse(body_with(FRAME_B64), 7, limits)
+    with pytest.raises(PayloadTooLarge):
+        parse(body_with(FRAME_B64), 7, PayloadLimits(max_frames=1))
+    with pytest.raises(PayloadTooLarge):
+        parse(body_with(FRAME_B64), 7, PayloadLimits(max_request_bytes=100))